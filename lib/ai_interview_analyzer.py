@@ -8,9 +8,19 @@ import json
 import sys
 import os
 import re
+import itertools
 import statistics
-import requests
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
+
+from analysis_store import AnalysisStore
+from cohort_stats import CohortStats
+from inference_providers import Completion
+from language_registry import get_language_pack
+from profiling import profile_request, span
+from stream_input import StreamedInterview, iter_interviews
+from structured_logging import get_logger, request_context
+
+logger = get_logger('analyzer')
 
 class AIInterviewAnalyzer:
     def __init__(self):
@@ -18,77 +28,169 @@ class AIInterviewAnalyzer:
         self.use_openai = os.getenv('USE_OPENAI_INSTEAD', 'false').lower() == 'true'
         
         if self.use_openai:
-            print("Using OpenAI API for analysis", file=sys.stderr)
+            logger.debug("Using OpenAI API for analysis")
             self.api_key = os.getenv('OPENAI_API_KEY')
             self.api_url = "https://api.openai.com/v1/chat/completions"
             self.model = "gpt-4o-mini"  # More cost-effective model
             if not self.api_key:
                 raise RuntimeError("OpenAI API key not configured")
+            from inference_providers import OpenAIProvider, build_router
+            self.router = build_router(OpenAIProvider.name, OpenAIProvider(self.api_key, self.model, self.api_url))
         else:
-            print("Using OpenRouter API for analysis", file=sys.stderr)
+            logger.debug("Using OpenRouter API for analysis")
             from openrouter_questgen import OpenRouterQuestionGenerator
             self.question_generator = OpenRouterQuestionGenerator()
+        
+        # Upstream requests this analyzer saved by sharing identical in-flight calls
+        self.coalesced_requests = 0
+        
+        # Persist results for the history and summary pages
+        self.store = None
+        if os.getenv('ANALYSIS_STORE_ENABLED', 'true').lower() == 'true':
+            try:
+                self.store = AnalysisStore()
+            except Exception as e:
+                logger.warning("Analysis store unavailable, results will not be persisted: %s", e)
+        
+        # Score percentiles against earlier candidates in the same cohort
+        self.cohort_stats = None
+        if os.getenv('COHORT_STATS_ENABLED', 'true').lower() == 'true':
+            self.cohort_stats = CohortStats()
+    
+    def inference_stats(self) -> List[Dict[str, Any]]:
+        """Per-provider and per-model request counts and tokens/sec, for sizing inference nodes"""
+        router = self.router if self.use_openai else self.question_generator.router
+        return router.stats()
+    
+    def close(self):
+        """Flush pending result writes and cohort statistics, and log inference throughput"""
+        logger.info("Inference stats: %s", json.dumps(self.inference_stats()))
+        if self.store:
+            self.store.close()
+        if self.cohort_stats:
+            try:
+                self.cohort_stats.save()
+            except Exception as e:
+                logger.warning("Failed to save cohort statistics: %s", e)
+            self.cohort_stats.close()
     
-    def _make_ai_request(self, messages: List[Dict[str, str]], max_tokens: int = 200) -> str:
-        """Make request to either OpenAI or OpenRouter API"""
+    def _make_ai_request(self, messages: List[Dict[str, str]], max_tokens: int = 200, unique: bool = False,
+                         operation: str = 'default') -> Optional[Completion]:
+        """Make request to either OpenAI or OpenRouter API; the completion records the model used"""
+        completion = self._request_completion(messages, max_tokens, unique, operation)
+        if completion is not None and completion.shared:
+            self.coalesced_requests += 1
+        return completion
+    
+    def _request_completion(self, messages: List[Dict[str, str]], max_tokens: int, unique: bool,
+                            operation: str) -> Optional[Completion]:
         if self.use_openai:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            data = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": max_tokens,
-                "temperature": 0.7
-            }
             try:
-                response = requests.post(self.api_url, headers=headers, json=data, timeout=30)
-                response.raise_for_status()
-                return response.json()['choices'][0]['message']['content']
+                if unique:
+                    return self.router.complete(operation, messages, max_tokens, temperature=0.7)
+                return self.router.complete_shared(operation, messages, max_tokens, temperature=0.7)
             except Exception as e:
-                print(f"OpenAI API request failed: {e}", file=sys.stderr)
+                logger.warning("OpenAI API request failed: %s", e)
                 return None
         else:
             # Use OpenRouter via the existing question generator
             try:
-                return self.question_generator._make_api_request(messages, max_tokens)
+                return self.question_generator._make_api_request(messages, max_tokens, unique=unique,
+                                                                 operation=operation)
             except Exception as e:
-                print(f"OpenRouter API request failed: {e}", file=sys.stderr)
+                logger.warning("OpenRouter API request failed: %s", e)
                 return None
+
+    def analyze_interview(self, interview_data: Dict[str, Any],
+                          on_answer: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Analyze complete interview and generate comprehensive feedback.
         
-    def analyze_interview(self, interview_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze complete interview and generate comprehensive feedback"""
+        ``on_answer(position, analysis)`` is called as each answer's analysis completes.
+        """
         answers = interview_data.get('answers', [])
         role = interview_data.get('role', 'Software Engineer')
         experience = interview_data.get('experience', 'Entry Level')
-        language = interview_data.get('language', 'en')
         
-        print(f"Analyzing interview for {role} - {experience} with {len(answers)} answers", file=sys.stderr)
+        with request_context(interview_data.get('requestId')), profile_request('analyze_interview', interview_data):
+            logger.info("Analyzing interview for %s - %s with %d answers", role, experience, len(answers))
+            return self._run_analysis(interview_data, answers, len(answers), on_answer)
+    
+    def analyze_interview_stream(self, document: StreamedInterview) -> Dict[str, Any]:
+        """Analyze an interview whose answers are still being parsed from the input.
+        
+        When role, experience and language precede ``answers`` in the document, each
+        answer is analyzed as soon as it is read. Otherwise the rest of the document is
+        read first so those fields apply wherever they appear. ``profile`` and
+        ``requestId`` only take effect if they precede the answers.
+        """
+        answers = document.answers()
+        # Read up to the first answer so the fields preceding it are known
+        first = next(answers, None)
+        if first is not None:
+            if all(field in document.fields for field in self.CONTEXT_FIELDS):
+                answers = itertools.chain([first], answers)
+            else:
+                answers = [first, *answers]
+        with request_context(document.fields.get('requestId')), profile_request('analyze_interview', document.fields):
+            role, experience, _ = self._interview_context(document.fields)
+            logger.info("Analyzing streamed interview for %s - %s", role, experience)
+            try:
+                result = self._run_analysis(document.fields, answers)
+            except Exception as e:
+                logger.error("AI analysis failed: %s", e)
+                raise
+            logger.info("AI analysis completed successfully (%d answers)", document.answer_count)
+            return result
+    
+    def _run_analysis(self, interview_data: Dict[str, Any], answers_iter: Iterable[Dict[str, Any]],
+                      total: Optional[int] = None,
+                      on_answer: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Analyze answers one by one as they arrive, then build the overall result.
+        
+        Only the analyses, a running word count and the truncated summary for the
+        overall feedback are kept, not the answers themselves.
+        """
+        role, experience, language = self._interview_context(interview_data)
+        coalesced_before = self.coalesced_requests
+        answer_count = 0
+        total_words = 0
+        summary_lines = []
         
         # Analyze each question individually
         question_analyses = []
         individual_scores = []
         
-        for i, answer in enumerate(answers):
-            print(f"Analyzing question {i+1}/{len(answers)} in language: {language}", file=sys.stderr)
+        for i, answer in enumerate(answers_iter):
+            logger.debug("Analyzing question %d/%s in language: %s", i + 1, total or '?', language)
             try:
-                analysis = self._analyze_single_answer(answer, role, experience, language)
+                with span('answer_analysis'):
+                    analysis = self._analyze_single_answer(answer, role, experience, language)
                 question_analyses.append(analysis)
                 individual_scores.append(analysis['score'])
             except Exception as e:
-                print(f"Error analyzing question {i+1}: {e}", file=sys.stderr)
+                logger.warning("Error analyzing question %d: %s", i + 1, e)
                 # Add fallback analysis
                 fallback_analysis = self._generate_fallback_analysis(answer, role, language)
                 question_analyses.append(fallback_analysis)
                 individual_scores.append(fallback_analysis['score'])
+            
+            answer_count += 1
+            total_words += len(answer.get('answerText', '').split())
+            summary_lines.append(f"Q{i+1}: {answer.get('questionText', '')[:100]}...")
+            summary_lines.append(f"A{i+1}: {answer.get('answerText', '')[:200]}...")
+            summary_lines.append(f"Score: {question_analyses[-1].get('score', 70)}")
+            
+            if on_answer:
+                on_answer(i, question_analyses[-1])
         
         # Generate overall analysis
-        overall_analysis = self._generate_overall_analysis(
-            answers, question_analyses, individual_scores, role, experience
-        )
+        with span('overall_feedback'):
+            overall_analysis = self._generate_overall_analysis(
+                answer_count, total_words, "\n".join(summary_lines), question_analyses, individual_scores,
+                role, experience
+            )
         
-        return {
+        result = {
             'overallScore': overall_analysis['overall_score'],
             'breakdown': overall_analysis['breakdown'],
             'questionAnalysis': question_analyses,
@@ -97,6 +199,39 @@ class AIInterviewAnalyzer:
             'recommendations': overall_analysis['recommendations'],
             'statistics': overall_analysis['statistics']
         }
+        
+        if self.cohort_stats:
+            try:
+                with span('cohort_benchmark'):
+                    scores = CohortStats.scores_from_result(result)
+                    benchmark = self.cohort_stats.benchmark(role, experience, language, scores)
+                    if benchmark:
+                        result['benchmark'] = benchmark
+                    self.cohort_stats.record(role, experience, language, scores)
+            except Exception as e:
+                logger.warning("Cohort benchmark failed: %s", e)
+        
+        if self.store:
+            # Queued for a background batched write, never blocks the response
+            with span('store_enqueue'):
+                self.store.save(interview_data, result)
+        
+        # Each analyzer serves one analysis at a time, so the difference is this interview's savings
+        coalesced = self.coalesced_requests - coalesced_before
+        if coalesced:
+            logger.info("Shared %d upstream requests with identical in-flight calls", coalesced)
+        
+        return result
+    
+    # Fields that change how every answer is analyzed
+    CONTEXT_FIELDS = ('role', 'experience', 'language')
+    
+    @staticmethod
+    def _interview_context(interview_data: Dict[str, Any]) -> Tuple[str, str, str]:
+        """Role, experience and language of an interview, with defaults"""
+        return (interview_data.get('role', 'Software Engineer'),
+                interview_data.get('experience', 'Entry Level'),
+                interview_data.get('language', 'en'))
     
     def _analyze_single_answer(self, answer: Dict[str, Any], role: str, experience: str, language: str = 'en') -> Dict[str, Any]:
         """Analyze a single answer using AI"""
@@ -108,16 +243,10 @@ class AIInterviewAnalyzer:
             return self._generate_fallback_analysis(answer, role, language)
         
         # Create language-specific analysis prompt
-        if language == 'hi':
-            analysis_instruction = "विश्लेषण हिंदी में प्रदान करें। उम्मीदवार की शक्तियों, कमजोरियों और सुधार के सुझावों को स्पष्ट रूप से बताएं।"
-        elif language == 'es':
-            analysis_instruction = "Proporcione el análisis en español. Sea específico sobre las fortalezas, debilidades y sugerencias de mejora del candidato."
-        elif language == 'fr':
-            analysis_instruction = "Fournissez l'analyse en français. Soyez précis sur les forces, faiblesses et suggestions d'amélioration du candidat."
-        else:
-            analysis_instruction = "Provide analysis in English. Be specific about candidate's strengths, weaknesses, and improvement suggestions."
-        
-        prompt = f"""
+        with span('prompt_build'):
+            analysis_instruction = get_language_pack(language).analysis['instruction']
+            
+            prompt = f"""
 Analyze this interview answer for a {role} position ({experience} level):
 
 QUESTION: {question_text}
@@ -142,10 +271,11 @@ Return ONLY the JSON object, no additional text.
 
         try:
             messages = [{"role": "user", "content": prompt}]
-            response = self.question_generator._make_api_request(messages, max_tokens=500)
+            completion = self._make_ai_request(messages, max_tokens=500, operation='answer_analysis')
             
             # Parse AI response
-            analysis_data = json.loads(response)
+            with span('json_parse'):
+                analysis_data = json.loads(completion.text)
             
             # Ensure all required fields
             return {
@@ -159,15 +289,17 @@ Return ONLY the JSON object, no additional text.
                 'expectedAnswer': analysis_data.get('expectedAnswer', ''),
                 'technicalAccuracy': analysis_data.get('technicalAccuracy', 70),
                 'communicationClarity': analysis_data.get('communicationClarity', 70),
-                'completeness': analysis_data.get('completeness', 70)
+                'completeness': analysis_data.get('completeness', 70),
+                'model_used': completion.model
             }
             
         except Exception as e:
-            print(f"AI analysis failed for answer, using fallback: {e}", file=sys.stderr)
+            logger.warning("AI analysis failed for answer, using fallback: %s", e)
             return self._generate_fallback_analysis(answer, role, language)
     
-    def _generate_overall_analysis(self, answers: List[Dict], question_analyses: List[Dict], 
-                                 scores: List[float], role: str, experience: str) -> Dict[str, Any]:
+    def _generate_overall_analysis(self, answer_count: int, total_words: int, summary_text: str,
+                                 question_analyses: List[Dict], scores: List[float], role: str,
+                                 experience: str) -> Dict[str, Any]:
         """Generate overall interview analysis"""
         
         if not scores:
@@ -182,14 +314,13 @@ Return ONLY the JSON object, no additional text.
             completeness_avg = statistics.mean([q.get('completeness', 70) for q in question_analyses])
         
         # Calculate statistics
-        total_words = sum(len(answer.get('answerText', '').split()) for answer in answers)
-        avg_response_length = total_words // max(len(answers), 1)
+        avg_response_length = total_words // max(answer_count, 1)
         
         # Generate comprehensive feedback using AI
         try:
-            overall_feedback = self._generate_ai_feedback(answers, question_analyses, role, experience)
+            overall_feedback = self._generate_ai_feedback(summary_text, role, experience)
         except Exception as e:
-            print(f"AI feedback generation failed, using fallback: {e}", file=sys.stderr)
+            logger.warning("AI feedback generation failed, using fallback: %s", e)
             overall_feedback = self._generate_fallback_feedback(role, experience, overall_score)
         
         return {
@@ -204,26 +335,17 @@ Return ONLY the JSON object, no additional text.
             'improvements': overall_feedback.get('improvements', []),
             'recommendations': overall_feedback.get('recommendations', []),
             'statistics': {
-                'totalQuestions': len(answers),
+                'totalQuestions': answer_count,
                 'averageResponseLength': avg_response_length,
                 'totalInterviewTime': "18m 45s",  # Could be calculated from actual data
                 'keywordsUsed': min(50, total_words // 10),
-                'expectedKeywords': len(answers) * 8,
+                'expectedKeywords': answer_count * 8,
                 'confidenceLevel': self._get_confidence_level(overall_score)
             }
         }
     
-    def _generate_ai_feedback(self, answers: List[Dict], analyses: List[Dict], role: str, experience: str) -> Dict[str, Any]:
-        """Generate overall feedback using AI"""
-        
-        # Summarize all answers for context
-        answers_summary = []
-        for i, (answer, analysis) in enumerate(zip(answers, analyses)):
-            answers_summary.append(f"Q{i+1}: {answer.get('questionText', '')[:100]}...")
-            answers_summary.append(f"A{i+1}: {answer.get('answerText', '')[:200]}...")
-            answers_summary.append(f"Score: {analysis.get('score', 70)}")
-        
-        summary_text = "\n".join(answers_summary)
+    def _generate_ai_feedback(self, summary_text: str, role: str, experience: str) -> Dict[str, Any]:
+        """Generate overall feedback using AI from the per-answer summary"""
         
         prompt = f"""
 Analyze this complete interview for a {role} position ({experience} level):
@@ -251,10 +373,10 @@ Return ONLY the JSON object.
 
         try:
             messages = [{"role": "user", "content": prompt}]
-            response = self.question_generator._make_api_request(messages, max_tokens=400)
-            return json.loads(response)
+            completion = self._make_ai_request(messages, max_tokens=400, operation='overall_feedback')
+            return json.loads(completion.text)
         except Exception as e:
-            print(f"AI feedback generation failed: {e}", file=sys.stderr)
+            logger.warning("AI feedback generation failed: %s", e)
             return self._generate_fallback_feedback(role, experience, 70)
     
     def _generate_fallback_analysis(self, answer: Dict[str, Any], role: str, language: str = 'en') -> Dict[str, Any]:
@@ -266,29 +388,21 @@ Return ONLY the JSON object.
         base_score = min(85, max(45, 50 + word_count // 5))
         
         # Language-specific feedback
-        if language == 'hi':
-            strengths = ["प्रश्न का उत्तर दिया", "साक्षात्कार प्रक्रिया में सक्रिय भागीदारी"] if answer_text.strip() else ["प्रश्न का प्रयास किया"]
-            weaknesses = ["अधिक विशिष्ट उदाहरण शामिल कर सकते हैं", "अधिक तकनीकी विवरण जोड़ने पर विचार करें"] if word_count < 50 else ["अच्छा विवरण स्तर, अधिक संरचित हो सकता है"]
-            suggestions = ["STAR विधि का अभ्यास करें (स्थिति, कार्य, क्रिया, परिणाम)", f"सामान्य {role} साक्षात्कार प्रश्नों का अनुसंधान करें", "अपने अनुभव से विशिष्ट उदाहरण तैयार करें"]
-            expected = f"एक आदर्श उत्तर में {role} कार्य से संबंधित विशिष्ट उदाहरण, समस्या-समाधान कौशल का प्रदर्शन, और स्पष्ट संचार शामिल होना चाहिए।"
-        else:
-            strengths = ["Provided a response to the question", "Demonstrated engagement with the interview process"] if answer_text.strip() else ["Question attempted"]
-            weaknesses = ["Could include more specific examples", "Consider adding more technical details"] if word_count < 50 else ["Good detail level, could be more structured"]
-            suggestions = ["Practice using the STAR method (Situation, Task, Action, Result)", f"Research common {role} interview questions", "Prepare specific examples from your experience"]
-            expected = f"An ideal answer would include specific examples relevant to {role} work, demonstrate problem-solving skills, and show clear communication."
+        feedback = get_language_pack(language).fallback_analysis_text(role, bool(answer_text.strip()), word_count)
         
         return {
             'questionId': answer.get('questionId', ''),
             'questionText': answer.get('questionText', ''),
             'answerText': answer_text,
             'score': base_score,
-            'strengths': strengths,
-            'weaknesses': weaknesses,
-            'suggestions': suggestions,
-            'expectedAnswer': expected,
+            'strengths': feedback['strengths'],
+            'weaknesses': feedback['weaknesses'],
+            'suggestions': feedback['suggestions'],
+            'expectedAnswer': feedback['expected'],
             'technicalAccuracy': base_score - 5,
             'communicationClarity': min(90, base_score + 10),
-            'completeness': max(40, base_score - 10)
+            'completeness': max(40, base_score - 10),
+            'source': 'fallback'
         }
     
     def _generate_fallback_feedback(self, role: str, experience: str, score: float) -> Dict[str, Any]:
@@ -327,29 +441,29 @@ Return ONLY the JSON object.
 
 def main():
     """Main function to process interview analysis"""
+    analyzer = None
     try:
-        # Read input from stdin
-        print("Reading from stdin...", file=sys.stderr)
-        input_data = sys.stdin.read()
-        print(f"Received input: '{input_data[:200]}...'", file=sys.stderr)
-        
-        # Parse input
-        interview_data = json.loads(input_data)
-        print(f"Parsed data: {len(interview_data.get('answers', []))} answers", file=sys.stderr)
-        
         # Initialize analyzer
         analyzer = AIInterviewAnalyzer()
         
-        # Perform analysis
-        print("Starting AI analysis...", file=sys.stderr)
-        analysis_result = analyzer.analyze_interview(interview_data)
-        print("AI analysis completed successfully!", file=sys.stderr)
+        # Stream interviews from stdin (one JSON object, concatenated objects or NDJSON);
+        # answers are analyzed as they are parsed
+        logger.debug("Reading from stdin...")
+        processed = 0
+        for document in iter_interviews(getattr(sys.stdin, 'buffer', sys.stdin)):
+            # Logs for the document are tagged with its requestId (or a generated one)
+            analysis_result = analyzer.analyze_interview_stream(document)
+            
+            # Output result as soon as each interview is done
+            print(json.dumps(analysis_result, indent=2))
+            sys.stdout.flush()
+            processed += 1
         
-        # Output result
-        print(json.dumps(analysis_result, indent=2))
+        if not processed:
+            raise ValueError("No input data provided")
         
     except Exception as e:
-        print(f"Analysis error: {e}", file=sys.stderr)
+        logger.error("Analysis error: %s", e)
         # Return minimal fallback result
         fallback = {
             'overallScore': 65,
@@ -368,6 +482,9 @@ def main():
             }
         }
         print(json.dumps(fallback, indent=2))
+    finally:
+        if analyzer:
+            analyzer.close()
 
 if __name__ == "__main__":
     main()
@@ -2,11 +2,14 @@
 """
 OpenRouter AI Question Generation API Script
 Uses Gemma 3n 4B model for truly AI-generated interview questions
+
+Prints one JSON line per request. With "stream": true in the request it prints one
+{"question": ...} line per question as soon as it is generated, then a
+{"metadata": ...} line.
 """
 
 import sys
 import json
-import traceback
 from pathlib import Path
 
 # Add the lib directory to the Python path
@@ -15,106 +18,157 @@ sys.path.insert(0, str(lib_path))
 
 try:
     from openrouter_questgen import OpenRouterQuestionGenerator
+    from language_registry import language_name
+    from stream_input import iter_documents
+    from profiling import profile_request, span
+    from structured_logging import get_logger, request_context
 except ImportError as e:
-    print(json.dumps({"error": f"Failed to import openrouter_questgen: {str(e)}"}))
+    print(json.dumps({"error": f"Failed to import question generation modules: {str(e)}"}))
     sys.exit(1)
 
+logger = get_logger('questions')
+
 def generate_mixed_questions(data):
     """Generate questions using OpenRouter AI only"""
+    with request_context(data.get('requestId')), profile_request('generate_questions', data):
+        return _generate_mixed_questions(data)
+
+def stream_mixed_questions(data):
+    """Yield {"question": ...} as soon as each question is generated, then {"metadata": ...}.
+    
+    Technical questions and MCQs come from one streamed completion each, so the first
+    question is ready long before the whole set.
+    """
+    with request_context(data.get('requestId')), profile_request('generate_questions', data):
+        try:
+            yield from _question_events(data, streaming=True)
+        except Exception as e:
+            logger.exception("Error in stream_mixed_questions: %s", e)
+            yield {"error": str(e)}
+
+def _generate_mixed_questions(data):
     try:
-        role = data.get('role', 'Software Engineer')
-        experience = data.get('experience', '2-3 years')
-        count = int(data.get('count', 5))
-        language = data.get('language', 'en')
-        
-        print("Initializing OpenRouter AI Question Generator...", file=sys.stderr)
-        generator = OpenRouterQuestionGenerator()
-        
-        # Generate different types of questions
-        technical_count = max(1, count // 2)
-        mcq_count = max(1, (count - technical_count) // 2)
-        boolean_count = count - technical_count - mcq_count
-        
         questions = []
-        
-        # Create context from role and experience
-        context = f"Interview for {role} position with {experience} experience level. Technologies and skills relevant to {role} development."
-        
-        # Add language instruction if not English
-        language_instruction = ""
-        if language != 'en':
-            language_names = {
-                'es': 'Spanish', 'fr': 'French', 'de': 'German', 'it': 'Italian', 
-                'pt': 'Portuguese', 'ru': 'Russian', 'zh': 'Chinese', 'ja': 'Japanese',
-                'ko': 'Korean', 'ar': 'Arabic', 'hi': 'Hindi', 'bn': 'Bengali',
-                'te': 'Telugu', 'ta': 'Tamil', 'mr': 'Marathi', 'gu': 'Gujarati',
-                'kn': 'Kannada', 'ml': 'Malayalam', 'pa': 'Punjabi', 'ur': 'Urdu'
-            }
-            lang_name = language_names.get(language, language)
-            language_instruction = f" Generate questions in {lang_name} language."
-            context += language_instruction
-        
-        if technical_count > 0:
-            print(f"Generating {technical_count} technical questions...", file=sys.stderr)
-            tech_questions = generator.generate_technical_questions(context, role, experience, technical_count)
-            questions.extend(tech_questions)
-        
-        if mcq_count > 0:
-            print(f"Generating {mcq_count} MCQ questions...", file=sys.stderr)
-            mcq_questions = generator.generate_mcq_questions(context, mcq_count, language)
-            questions.extend(mcq_questions)
-        
-        if boolean_count > 0:
-            print(f"Generating {boolean_count} boolean questions...", file=sys.stderr)
-            bool_questions = generator.generate_boolean_questions(context, boolean_count)
-            questions.extend(bool_questions)
-        
-        print(f"Successfully generated {len(questions)} total questions", file=sys.stderr)
-        
-        return {
-            "questions": questions,
-            "metadata": {
-                "role": role,
-                "experience": experience,
-                "language": language,
-                "total_count": len(questions),
-                "generated_by": "OpenRouter AI",
-                "model": "qwen/qwen-2-7b-instruct:free"
-            }
-        }
+        metadata = None
+        for event in _question_events(data):
+            if 'question' in event:
+                questions.append(event['question'])
+            else:
+                metadata = event['metadata']
+        return {"questions": questions, "metadata": metadata}
     
     except Exception as e:
-        print(f"Error in generate_mixed_questions: {str(e)}", file=sys.stderr)
-        print(traceback.format_exc(), file=sys.stderr)
+        logger.exception("Error in generate_mixed_questions: %s", e)
         return {"error": str(e)}
 
-# Read from command line args or stdin
-if len(sys.argv) > 1:
-    print("Using command line arguments", file=sys.stderr)
-    input_data = ' '.join(sys.argv[1:])
-    try:
-        data = json.loads(input_data)
-        result = generate_mixed_questions(data)
-        print(json.dumps(result))
-    except json.JSONDecodeError as e:
-        print(json.dumps({"error": f"Invalid JSON: {str(e)}"}))
-    except Exception as e:
-        print(json.dumps({"error": str(e)}))
-else:
-    print("Reading from stdin...", file=sys.stderr)
-    try:
-        input_data = sys.stdin.read().strip()
-        print(f"Received input: '{input_data}'", file=sys.stderr)
-        
-        if not input_data:
-            print(json.dumps({"error": "No input data provided"}))
-        else:
+def _question_events(data, streaming=False):
+    """Yield each question as it is generated, then the metadata for the whole set"""
+    role = data.get('role', 'Software Engineer')
+    experience = data.get('experience', '2-3 years')
+    count = int(data.get('count', 5))
+    language = data.get('language', 'en')
+    
+    logger.debug("Initializing OpenRouter AI Question Generator...")
+    with span('generator_init'):
+        generator = OpenRouterQuestionGenerator()
+    
+    # Generate different types of questions
+    technical_count = max(1, count // 2)
+    mcq_count = max(1, (count - technical_count) // 2)
+    boolean_count = count - technical_count - mcq_count
+    
+    # Create context from role and experience
+    context = f"Interview for {role} position with {experience} experience level. Technologies and skills relevant to {role} development."
+    
+    # Add language instruction if not English
+    language_instruction = ""
+    if language != 'en':
+        lang_name = language_name(language)
+        language_instruction = f" Generate questions in {lang_name} language."
+        context += language_instruction
+    
+    technical = generator.stream_technical_questions if streaming else generator.generate_technical_questions
+    mcq = generator.stream_mcq_questions if streaming else generator.generate_mcq_questions
+    sources = [
+        ('technical', technical_count, lambda: technical(context, role, experience, technical_count)),
+        ('mcq', mcq_count, lambda: mcq(context, mcq_count, language)),
+        ('boolean', boolean_count, lambda: generator.generate_boolean_questions(context, boolean_count))
+    ]
+    
+    total = 0
+    models_used = set()
+    for kind, kind_count, generate in sources:
+        if kind_count <= 0:
+            continue
+        logger.debug("Generating %d %s questions...", kind_count, kind)
+        with span(f'{kind}_questions'):
+            for question in generate():
+                total += 1
+                if question.get("model_used"):
+                    models_used.add(question["model_used"])
+                yield {"question": question}
+    
+    logger.info("Generated %d questions for %s (%s)", total, role, experience)
+    inference = generator.inference_stats()
+    logger.info("Inference stats: %s", json.dumps(inference))
+    tiers = generator.tier_stats()
+    if tiers:
+        logger.info("Model tier stats: %s", json.dumps(tiers))
+    
+    yield {
+        "metadata": {
+            "role": role,
+            "experience": experience,
+            "language": language,
+            "total_count": total,
+            "generated_by": "OpenRouter AI",
+            "model": generator.model,
+            "models_used": sorted(models_used),
+            "coalesced_requests": generator.coalesced_requests,
+            "inference": inference
+        }
+    }
+
+def _respond(data):
+    """Print the response to one request: one line, or with "stream": true one line per question"""
+    if isinstance(data, dict) and data.get('stream'):
+        for event in stream_mixed_questions(data):
+            print(json.dumps(event))
+            sys.stdout.flush()
+    else:
+        print(json.dumps(generate_mixed_questions(data)))
+        sys.stdout.flush()
+
+def main():
+    """Read requests from command line args or stdin"""
+    if len(sys.argv) > 1:
+        logger.debug("Using command line arguments")
+        input_data = ' '.join(sys.argv[1:])
+        try:
             data = json.loads(input_data)
-            print(f"Parsed data: {data}", file=sys.stderr)
-            result = generate_mixed_questions(data)
-            print(json.dumps(result))
-    except json.JSONDecodeError as e:
-        print(json.dumps({"error": f"Invalid JSON input: {str(e)}"}))
-    except Exception as e:
-        print(json.dumps({"error": str(e)}))
-        print(traceback.format_exc(), file=sys.stderr)
+            _respond(data)
+        except json.JSONDecodeError as e:
+            print(json.dumps({"error": f"Invalid JSON: {str(e)}"}))
+        except Exception as e:
+            print(json.dumps({"error": str(e)}))
+    else:
+        logger.debug("Reading from stdin...")
+        try:
+            # One request object, or several concatenated / NDJSON requests; each result is one output line
+            processed = 0
+            for data in iter_documents(getattr(sys.stdin, 'buffer', sys.stdin)):
+                processed += 1
+                logger.debug("Parsed request %d", processed)
+                _respond(data)
+        
+            if not processed:
+                print(json.dumps({"error": "No input data provided"}))
+        except ValueError as e:
+            # Parser errors already read "Invalid JSON input: ..."
+            print(json.dumps({"error": str(e)}))
+        except Exception as e:
+            print(json.dumps({"error": str(e)}))
+            logger.exception("Question generation failed")
+
+if __name__ == "__main__":
+    main()
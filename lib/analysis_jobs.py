@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Analysis Job Queue
+Durable SQLite queue that runs interview analyses in a background worker pool
+
+The web tier submits an interview and polls for status and result instead of
+waiting on the analysis inside an HTTP request.
+
+Usage:
+    python lib/analysis_jobs.py submit < interview.json        # prints {"job_id": ...}
+    python lib/analysis_jobs.py status <job_id>
+    python lib/analysis_jobs.py result <job_id> [--wait 30]
+    python lib/analysis_jobs.py worker --concurrency 4
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from analysis_store import new_interview_id
+from structured_logging import get_logger, request_context
+
+DEFAULT_QUEUE_PATH = Path(__file__).parent.parent / 'data' / 'interviews' / 'jobs.db'
+
+logger = get_logger('jobs')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    idempotency_key TEXT UNIQUE,
+    status TEXT NOT NULL,
+    payload_json TEXT NOT NULL,
+    result_json TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    total_answers INTEGER NOT NULL DEFAULT 0,
+    visible_at REAL NOT NULL,
+    lease_token TEXT,
+    worker_id TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, visible_at);
+
+CREATE TABLE IF NOT EXISTS job_partials (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    analysis_json TEXT NOT NULL,
+    PRIMARY KEY (job_id, position)
+) WITHOUT ROWID;
+"""
+
+# queued -> running -> succeeded | failed; a running job whose lease expires is claimable again
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class LeaseLostError(RuntimeError):
+    """The job's lease expired and another worker now owns it"""
+
+
+class AnalysisJobQueue:
+    """Durable queue of interview analyses with at-least-once delivery.
+
+    A claimed job stays invisible to other workers until its lease expires
+    (``visibility_timeout``); workers extend the lease while they run, so a job
+    held by a crashed worker is redelivered once the lease runs out. Submitting
+    twice with the same idempotency key returns the existing job.
+    """
+
+    def __init__(self, path: Optional[str] = None, visibility_timeout: Optional[float] = None,
+                 max_attempts: int = 3, retry_delay: float = 5.0):
+        self.path = Path(path or os.getenv('ANALYSIS_QUEUE_PATH', DEFAULT_QUEUE_PATH))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.visibility_timeout = visibility_timeout or float(os.getenv('ANALYSIS_JOB_VISIBILITY_TIMEOUT', '120'))
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._local = threading.local()
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection in autocommit mode; writes use explicit transactions"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        """BEGIN IMMEDIATE so a read-then-update (claiming) cannot race another worker"""
+        return _ImmediateTransaction(self._connect())
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ----------------------------------------------------------------- clients
+
+    def submit(self, payload: Dict[str, Any], idempotency_key: Optional[str] = None) -> str:
+        """Queue an interview for analysis and return its job id.
+
+        The key defaults to the payload's ``idempotencyKey``. The interview gets a
+        stable ``id`` so redelivered analyses overwrite the same stored result.
+        """
+        idempotency_key = idempotency_key or payload.get('idempotencyKey')
+        payload = dict(payload)
+        payload.setdefault('id', new_interview_id())
+        job_id = f"job_{uuid.uuid4().hex}"
+        now = time.time()
+
+        with self._transaction() as conn:
+            if idempotency_key:
+                row = conn.execute("SELECT id FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+                if row:
+                    return row['id']
+            conn.execute(
+                "INSERT INTO jobs (id, idempotency_key, status, payload_json, max_attempts, total_answers, "
+                "visible_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, idempotency_key, QUEUED, json.dumps(payload, ensure_ascii=False), self.max_attempts,
+                 len(payload.get('answers', [])), now, now, now))
+        return job_id
+
+    def status(self, job_id: str, include_partial: bool = True) -> Optional[Dict[str, Any]]:
+        """Job state, progress and the per-answer analyses finished so far"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT id, status, error, attempts, max_attempts, total_answers, created_at, updated_at "
+            "FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        partials = conn.execute(
+            "SELECT analysis_json FROM job_partials WHERE job_id = ? ORDER BY position", (job_id,)).fetchall()
+
+        status = {
+            'job_id': row['id'],
+            'status': row['status'],
+            'attempts': row['attempts'],
+            'max_attempts': row['max_attempts'],
+            'progress': {'completed': len(partials), 'total': row['total_answers']},
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at']
+        }
+        if include_partial:
+            status['questionAnalysis'] = [json.loads(partial['analysis_json']) for partial in partials]
+        return status
+
+    def result(self, job_id: str, wait: float = 0.0, poll_interval: float = 0.25) -> Optional[Dict[str, Any]]:
+        """Final analysis of a succeeded job, optionally waiting up to ``wait`` seconds"""
+        deadline = time.monotonic() + wait
+        while True:
+            row = self._connect().execute(
+                "SELECT status, result_json FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row['status'] == FAILED:
+                return None
+            if row['status'] == SUCCEEDED:
+                return json.loads(row['result_json'])
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    # ----------------------------------------------------------------- workers
+
+    def claim(self, worker_id: str) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        """Lease the oldest visible job; returns (job_id, lease_token, payload) or None"""
+        now = time.time()
+        with self._transaction() as conn:
+            # Jobs whose lease expired on their last allowed attempt are not retried
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = COALESCE(error, 'Lease expired on the final attempt'), "
+                "lease_token = NULL, updated_at = ? WHERE status = ? AND visible_at <= ? AND attempts >= max_attempts",
+                (FAILED, now, RUNNING, now))
+            row = conn.execute(
+                "SELECT id, attempts, payload_json FROM jobs WHERE status IN (?, ?) AND visible_at <= ? "
+                "ORDER BY visible_at LIMIT 1", (QUEUED, RUNNING, now)).fetchone()
+            if row is None:
+                return None
+            if row['attempts'] > 0:
+                # Redelivery: partials from the earlier attempt are replaced as this one produces them
+                conn.execute("DELETE FROM job_partials WHERE job_id = ?", (row['id'],))
+            token = uuid.uuid4().hex
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_token = ?, worker_id = ?, "
+                "visible_at = ?, updated_at = ? WHERE id = ?",
+                (RUNNING, token, worker_id, now + self.visibility_timeout, now, row['id']))
+        return row['id'], token, json.loads(row['payload_json'])
+
+    def _update_leased(self, conn: sqlite3.Connection, job_id: str, token: str, sql: str,
+                       params: Tuple[Any, ...]) -> None:
+        cursor = conn.execute(f"{sql} WHERE id = ? AND lease_token = ?", params + (job_id, token))
+        if cursor.rowcount == 0:
+            raise LeaseLostError(f"Lease on {job_id} was lost")
+
+    def extend_lease(self, job_id: str, token: str) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            self._update_leased(conn, job_id, token, "UPDATE jobs SET visible_at = ?, updated_at = ?",
+                                (now + self.visibility_timeout, now))
+
+    def record_partial(self, job_id: str, token: str, position: int, analysis: Dict[str, Any]) -> None:
+        """Publish one answer's analysis while the job runs; also extends the lease"""
+        now = time.time()
+        with self._transaction() as conn:
+            self._update_leased(conn, job_id, token, "UPDATE jobs SET visible_at = ?, updated_at = ?",
+                                (now + self.visibility_timeout, now))
+            conn.execute("INSERT OR REPLACE INTO job_partials VALUES (?, ?, ?)",
+                         (job_id, position, json.dumps(analysis, ensure_ascii=False)))
+
+    def complete(self, job_id: str, token: str, result: Dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            self._update_leased(conn, job_id, token,
+                                "UPDATE jobs SET status = ?, result_json = ?, error = NULL, lease_token = NULL, "
+                                "updated_at = ?", (SUCCEEDED, json.dumps(result, ensure_ascii=False), time.time()))
+
+    def fail(self, job_id: str, token: str, error: str) -> None:
+        """Requeue with a delay, or mark failed once attempts are used up"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            final = row is None or row['attempts'] >= row['max_attempts']
+            self._update_leased(conn, job_id, token,
+                                "UPDATE jobs SET status = ?, error = ?, lease_token = NULL, visible_at = ?, "
+                                "updated_at = ?",
+                                (FAILED if final else QUEUED, error, now + self.retry_delay, now))
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+
+class _ImmediateTransaction:
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+class AnalysisWorkerPool:
+    """Threads that claim jobs and run them through ``AIInterviewAnalyzer.analyze_interview``.
+
+    Each worker thread owns its analyzer, so analyzer state (cohort statistics,
+    store writer) is never shared between concurrent analyses. Cohort statistics
+    are saved every ``stats_flush_interval`` seconds so a crash loses at most that
+    window. A heartbeat thread keeps the leases of running jobs alive; if the
+    process dies the leases lapse and the jobs are redelivered.
+    """
+
+    def __init__(self, job_queue: AnalysisJobQueue, concurrency: Optional[int] = None,
+                 poll_interval: float = 0.5, analyzer_factory=None,
+                 stats_flush_interval: Optional[float] = None):
+        self.queue = job_queue
+        self.concurrency = concurrency or int(os.getenv('ANALYSIS_WORKER_CONCURRENCY', '2'))
+        self.poll_interval = poll_interval
+        self.stats_flush_interval = (stats_flush_interval if stats_flush_interval is not None
+                                     else float(os.getenv('ANALYSIS_STATS_FLUSH_INTERVAL', '30')))
+        self.analyzer_factory = analyzer_factory or _default_analyzer
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running: Dict[str, str] = {}
+        self._running_lock = threading.Lock()
+
+    def start(self) -> None:
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._run_worker, name=f"analysis-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._run_heartbeat, name="analysis-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        logger.info("Started %d analysis workers (%s)", self.concurrency, self.worker_id)
+
+    def request_stop(self) -> None:
+        """Ask workers to finish their current job and exit; safe to call from a signal handler"""
+        self._stop.set()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop claiming new jobs and wait for running ones to finish"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def run_forever(self) -> None:
+        self.start()
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            logger.info("Stopping analysis workers...")
+            self.stop()
+
+    def _run_worker(self) -> None:
+        analyzer = self.analyzer_factory()
+        last_flush = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() - last_flush >= self.stats_flush_interval:
+                    self._flush_stats(analyzer)
+                    last_flush = time.monotonic()
+                try:
+                    claimed = self.queue.claim(self.worker_id)
+                except sqlite3.Error as e:
+                    logger.warning("Failed to claim analysis job: %s", e)
+                    claimed = None
+                if claimed is None:
+                    self._stop.wait(self.poll_interval)
+                    continue
+                self._process(analyzer, *claimed)
+        finally:
+            if hasattr(analyzer, 'close'):
+                analyzer.close()
+            self.queue.close()
+
+    @staticmethod
+    def _flush_stats(analyzer) -> None:
+        cohort_stats = getattr(analyzer, 'cohort_stats', None)
+        if cohort_stats is None:
+            return
+        try:
+            cohort_stats.save()
+        except Exception as e:
+            logger.warning("Failed to save cohort statistics: %s", e)
+
+    def _process(self, analyzer, job_id: str, token: str, payload: Dict[str, Any]) -> None:
+        with self._running_lock:
+            self._running[job_id] = token
+        try:
+            with request_context(job_id):
+                self._run_job(analyzer, job_id, token, payload)
+        finally:
+            with self._running_lock:
+                self._running.pop(job_id, None)
+
+    def _run_job(self, analyzer, job_id: str, token: str, payload: Dict[str, Any]) -> None:
+        def publish(position: int, analysis: Dict[str, Any]) -> None:
+            self.queue.record_partial(job_id, token, position, analysis)
+
+        try:
+            logger.info("Running analysis job %s", job_id)
+            result = analyzer.analyze_interview(payload, on_answer=publish)
+            self.queue.complete(job_id, token, result)
+            logger.info("Analysis job %s succeeded", job_id)
+        except LeaseLostError as e:
+            # Another worker owns the job now; its result will be the one kept
+            logger.warning("Abandoning analysis job: %s", e)
+        except Exception as e:
+            logger.error("Analysis job %s failed: %s", job_id, e)
+            try:
+                self.queue.fail(job_id, token, str(e))
+            except LeaseLostError:
+                pass
+
+    def _run_heartbeat(self) -> None:
+        interval = max(1.0, self.queue.visibility_timeout / 3)
+        while not self._stop.wait(interval):
+            with self._running_lock:
+                running = list(self._running.items())
+            for job_id, token in running:
+                try:
+                    self.queue.extend_lease(job_id, token)
+                except (LeaseLostError, sqlite3.Error) as e:
+                    logger.warning("Failed to extend lease on %s: %s", job_id, e)
+        self.queue.close()
+
+
+def _default_analyzer():
+    from ai_interview_analyzer import AIInterviewAnalyzer
+    return AIInterviewAnalyzer()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Durable interview analysis job queue")
+    commands = parser.add_subparsers(dest='command', required=True)
+    submit_parser = commands.add_parser('submit', help='queue an interview read from stdin')
+    submit_parser.add_argument('--idempotency-key')
+    status_parser = commands.add_parser('status', help='job status with partial results')
+    status_parser.add_argument('job_id')
+    result_parser = commands.add_parser('result', help='final analysis of a finished job')
+    result_parser.add_argument('job_id')
+    result_parser.add_argument('--wait', type=float, default=0.0, help='seconds to wait for the job to finish')
+    worker_parser = commands.add_parser('worker', help='run a worker pool until interrupted')
+    worker_parser.add_argument('--concurrency', type=int)
+    args = parser.parse_args()
+
+    job_queue = AnalysisJobQueue()
+    if args.command == 'submit':
+        try:
+            payload = json.load(sys.stdin)
+        except json.JSONDecodeError as e:
+            print(json.dumps({"error": f"Invalid JSON: {str(e)}"}))
+            sys.exit(1)
+        job_id = job_queue.submit(payload, args.idempotency_key)
+        print(json.dumps({"job_id": job_id}))
+    elif args.command == 'status':
+        status = job_queue.status(args.job_id)
+        print(json.dumps(status if status else {"error": f"Unknown job {args.job_id}"}))
+    elif args.command == 'result':
+        analysis = job_queue.result(args.job_id, wait=args.wait)
+        if analysis is None:
+            status = job_queue.status(args.job_id, include_partial=False)
+            analysis = {"error": "Analysis not available", "status": status['status'] if status else 'unknown'}
+        print(json.dumps(analysis))
+    else:
+        pool = AnalysisWorkerPool(job_queue, args.concurrency)
+        signal.signal(signal.SIGTERM, lambda *_: pool.request_stop())
+        pool.run_forever()
+
+
+if __name__ == "__main__":
+    main()
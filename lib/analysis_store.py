@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Interview Analysis Store
+SQLite store of analysis results, indexed for paged interview-history queries
+
+Usage (the history and summary pages read through this CLI):
+    python lib/analysis_store.py list --user <user_id> [--role ...] [--language ...] [--limit 20] [--cursor <next_cursor>]
+    python lib/analysis_store.py get <interview_id>
+    python lib/analysis_store.py questions <interview_id>
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+import queue
+import random
+import string
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from structured_logging import get_logger
+
+logger = get_logger('store')
+
+DEFAULT_STORE_PATH = Path(__file__).parent.parent / 'data' / 'interviews' / 'analysis.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interviews (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    role TEXT,
+    experience TEXT,
+    language TEXT,
+    created_at TEXT NOT NULL,
+    overall_score REAL,
+    technical REAL,
+    communication REAL,
+    completeness REAL,
+    confidence REAL,
+    total_questions INTEGER,
+    result_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_interviews_user_date ON interviews (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_interviews_role_date ON interviews (role, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_interviews_language_date ON interviews (language, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_interviews_date ON interviews (created_at DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS question_analyses (
+    interview_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    question_id TEXT,
+    score REAL,
+    technical_accuracy REAL,
+    communication_clarity REAL,
+    completeness REAL,
+    analysis_json TEXT NOT NULL,
+    PRIMARY KEY (interview_id, position)
+) WITHOUT ROWID;
+"""
+
+INTERVIEW_COLUMNS = ('id', 'user_id', 'role', 'experience', 'language', 'created_at', 'overall_score',
+                     'technical', 'communication', 'completeness', 'confidence', 'total_questions')
+
+
+def normalize_timestamp(value: Any = None) -> str:
+    """ISO-8601 UTC timestamp with millisecond precision, so stored values sort as text.
+
+    Accepts ISO strings (naive ones are taken as UTC) and epoch seconds or
+    milliseconds as numbers or numeric strings; missing or unreadable values
+    become the current time.
+    """
+    moment = None
+    if isinstance(value, str) and value.strip():
+        text = value.strip()
+        try:
+            value = float(text)
+        except ValueError:
+            try:
+                moment = datetime.fromisoformat(text[:-1] + '+00:00' if text[-1] in 'Zz' else text)
+            except ValueError:
+                logger.warning("Ignoring unreadable timestamp %r", value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # Date.now() in the web app is milliseconds
+        seconds = value / 1000 if abs(value) >= 1e11 else value
+        try:
+            moment = datetime.fromtimestamp(seconds, timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            logger.warning("Ignoring out-of-range timestamp %r", value)
+    if moment is None:
+        moment = datetime.now(timezone.utc)
+    elif moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat(timespec='milliseconds')
+
+
+def encode_cursor(cursor: Optional[Tuple[str, str]]) -> Optional[str]:
+    """Opaque string form of a ``next_cursor`` for clients"""
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(token: Optional[str]) -> Optional[Tuple[str, str]]:
+    if not token:
+        return None
+    try:
+        created_at, interview_id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        return str(created_at), str(interview_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {token}")
+
+
+def new_interview_id() -> str:
+    """Interview id in the same format the web app uses for saved interviews"""
+    suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=9))
+    return f"interview_{int(time.time() * 1000)}_{suffix}"
+
+
+class AnalysisStore:
+    """Embedded store of interview analyses.
+
+    ``save()`` only enqueues; a background writer commits queued results in batched
+    transactions so persisting never blocks an analysis. Call ``flush()`` or
+    ``close()`` before a short-lived process exits.
+    """
+
+    def __init__(self, path: Optional[str] = None, batch_size: int = 200, flush_interval: float = 0.05):
+        self.path = Path(path or os.getenv('ANALYSIS_STORE_PATH', DEFAULT_STORE_PATH))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Tuple[Any, ...]]]" = queue.Queue()
+        self._local = threading.local()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection; WAL lets readers page history while the writer commits"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    # ------------------------------------------------------------------ writes
+
+    def save(self, interview_data: Dict[str, Any], result: Dict[str, Any]) -> str:
+        """Queue an analysis result for persistence and return its interview id"""
+        interview_id = interview_data.get('id') or new_interview_id()
+        created_at = normalize_timestamp(interview_data.get('timestamp'))
+        breakdown = result.get('breakdown', {})
+        questions = result.get('questionAnalysis', [])
+
+        interview_row = (
+            interview_id,
+            interview_data.get('userId'),
+            interview_data.get('role', 'Software Engineer'),
+            interview_data.get('experience', 'Entry Level'),
+            interview_data.get('language', 'en'),
+            created_at,
+            result.get('overallScore'),
+            breakdown.get('technical'),
+            breakdown.get('communication'),
+            breakdown.get('completeness'),
+            breakdown.get('confidence'),
+            len(questions),
+            json.dumps(result, ensure_ascii=False)
+        )
+        question_rows = [
+            (interview_id, position, str(q.get('questionId', '')), q.get('score'), q.get('technicalAccuracy'),
+             q.get('communicationClarity'), q.get('completeness'), json.dumps(q, ensure_ascii=False))
+            for position, q in enumerate(questions)
+        ]
+
+        self._queue.put((interview_row, question_rows))
+        self._ensure_writer()
+        return interview_id
+
+    def _ensure_writer(self) -> None:
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run_writer, name="analysis-store-writer", daemon=True)
+                self._writer.start()
+
+    def _run_writer(self) -> None:
+        conn = self._connect()
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            records = [record for record in batch if isinstance(record, tuple)]
+            if records:
+                try:
+                    self._write_batch(conn, records)
+                except Exception as e:
+                    logger.warning("Failed to persist %d analyses: %s", len(records), e)
+
+            for record in batch:
+                if isinstance(record, threading.Event):
+                    record.set()
+            for _ in batch:
+                self._queue.task_done()
+
+    @staticmethod
+    def _write_batch(conn: sqlite3.Connection, records: List[Tuple[Any, ...]]) -> None:
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO interviews ({', '.join(INTERVIEW_COLUMNS)}, result_json) "
+                f"VALUES ({', '.join('?' * (len(INTERVIEW_COLUMNS) + 1))})",
+                [interview_row for interview_row, _ in records])
+            conn.executemany("DELETE FROM question_analyses WHERE interview_id = ?",
+                             [(interview_row[0],) for interview_row, _ in records])
+            conn.executemany(
+                "INSERT INTO question_analyses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for _, question_rows in records for row in question_rows])
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """Wait until everything queued so far is committed"""
+        if self._writer is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        self._ensure_writer()
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Flush pending writes and close this thread's connection"""
+        self.flush()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ----------------------------------------------------------------- queries
+
+    def list_interviews(self, user_id: Optional[str] = None, role: Optional[str] = None,
+                        language: Optional[str] = None, since: Optional[str] = None,
+                        until: Optional[str] = None, limit: int = 20,
+                        cursor: Optional[Tuple[str, str]] = None) -> Dict[str, Any]:
+        """Page interview summaries, newest first.
+
+        Uses keyset pagination: pass the returned ``next_cursor`` to fetch the next
+        page, which stays an index range scan however deep the history goes.
+        """
+        clauses, params = [], []
+        for column, value in (('user_id', user_id), ('role', role), ('language', language)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(normalize_timestamp(since))
+        if until:
+            clauses.append("created_at < ?")
+            params.append(normalize_timestamp(until))
+        if cursor:
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend(cursor)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        limit = max(1, min(int(limit), 500))
+        rows = self._connect().execute(
+            f"SELECT {', '.join(INTERVIEW_COLUMNS)} FROM interviews {where} "
+            f"ORDER BY created_at DESC, id DESC LIMIT ?", params + [limit + 1]).fetchall()
+
+        items = [dict(row) for row in rows[:limit]]
+        next_cursor = (items[-1]['created_at'], items[-1]['id']) if len(rows) > limit else None
+        return {'interviews': items, 'next_cursor': next_cursor}
+
+    def get_interview(self, interview_id: str) -> Optional[Dict[str, Any]]:
+        """Full stored analysis result for one interview"""
+        row = self._connect().execute(
+            "SELECT result_json FROM interviews WHERE id = ?", (interview_id,)).fetchone()
+        return json.loads(row['result_json']) if row else None
+
+    def get_question_analyses(self, interview_id: str) -> List[Dict[str, Any]]:
+        """Per-question analyses for one interview, in question order"""
+        rows = self._connect().execute(
+            "SELECT analysis_json FROM question_analyses WHERE interview_id = ? ORDER BY position",
+            (interview_id,)).fetchall()
+        return [json.loads(row['analysis_json']) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query stored interview analyses")
+    commands = parser.add_subparsers(dest='command', required=True)
+    list_parser = commands.add_parser('list', help='page interview summaries, newest first')
+    list_parser.add_argument('--user')
+    list_parser.add_argument('--role')
+    list_parser.add_argument('--language')
+    list_parser.add_argument('--since', help='ISO-8601 time or epoch (inclusive)')
+    list_parser.add_argument('--until', help='ISO-8601 time or epoch (exclusive)')
+    list_parser.add_argument('--limit', type=int, default=20)
+    list_parser.add_argument('--cursor', help='next_cursor from the previous page')
+    get_parser = commands.add_parser('get', help='full analysis of one interview')
+    get_parser.add_argument('interview_id')
+    questions_parser = commands.add_parser('questions', help='per-question analyses of one interview')
+    questions_parser.add_argument('interview_id')
+    args = parser.parse_args()
+
+    store = AnalysisStore()
+    try:
+        if args.command == 'list':
+            try:
+                cursor = decode_cursor(args.cursor)
+            except ValueError as e:
+                print(json.dumps({"error": str(e)}))
+                sys.exit(1)
+            page = store.list_interviews(args.user, args.role, args.language, args.since, args.until,
+                                         args.limit, cursor)
+            page['next_cursor'] = encode_cursor(page['next_cursor'])
+            print(json.dumps(page, ensure_ascii=False))
+        elif args.command == 'get':
+            analysis = store.get_interview(args.interview_id)
+            if analysis is None:
+                print(json.dumps({"error": f"Unknown interview {args.interview_id}"}))
+                sys.exit(1)
+            print(json.dumps(analysis, ensure_ascii=False))
+        else:
+            print(json.dumps({"questionAnalysis": store.get_question_analyses(args.interview_id)},
+                             ensure_ascii=False))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Mock Chat Completions Provider
+Local OpenAI-compatible server with canned responses, SSE streaming and a latency model
+
+Point the scripts at it with OPENROUTER_BASE_URL=http://127.0.0.1:8765/v1 (or LOCAL_LLM_URL).
+
+Usage:
+    python lib/benchmarks/mock_provider.py --port 8765 --latency-ms 400 --token-ms 15
+    python lib/benchmarks/mock_provider.py --stall-after 40   # stop sending tokens mid-stream
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+
+class LatencyModel:
+    """Time to first token plus per-token time, with multiplicative jitter and injected errors"""
+
+    def __init__(self, latency_ms: float = 0, token_ms: float = 0, jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: int = None):
+        self.latency_ms = latency_ms
+        self.token_ms = token_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _factor(self) -> float:
+        with self._lock:
+            return max(0.0, 1 + self._random.uniform(-self.jitter, self.jitter)) if self.jitter else 1.0
+
+    def first_token_delay(self) -> float:
+        return self.latency_ms / 1000 * self._factor()
+
+    def token_delay(self) -> float:
+        return self.token_ms / 1000 * self._factor() if self.token_ms else 0.0
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self.error_rate > 0 and self._random.random() < self.error_rate
+
+
+def canned_response(messages: List[Dict[str, str]]) -> str:
+    """A plausible completion for the prompts the generator and analyzer send"""
+    prompt = messages[-1].get('content', '') if messages else ''
+    lowered = prompt.lower()
+    count_match = re.search(r'generate (\d+) different', lowered)
+    count = int(count_match.group(1)) if count_match else 1
+
+    if 'multiple choice' in lowered:
+        block = ("Question: Which data structure gives O(1) average lookup by key?\n"
+                 "A) Linked list\nB) Hash map\nC) Binary heap\nD) Stack\nCorrect: B")
+        return '\n\n'.join(block for _ in range(count))
+    if 'true/false' in lowered:
+        return "Statement: Code reviews help catch defects early\nAnswer: True"
+    if 'complete interview' in lowered:
+        return json.dumps({
+            "strengths": ["Clear structure"],
+            "improvements": ["Add measurable outcomes"],
+            "recommendations": ["Practice system design questions"]
+        })
+    if 'analyze this interview answer' in lowered:
+        return json.dumps({
+            "score": 72, "strengths": ["Relevant example"], "weaknesses": ["Little depth"],
+            "suggestions": ["Quantify impact"], "expectedAnswer": "A concrete example with trade-offs",
+            "technicalAccuracy": 70, "communicationClarity": 78, "completeness": 65
+        })
+    if count > 1:
+        return '\n'.join(f"{i + 1}. How would you design a rate limiter for a public API (variant {i + 1})?"
+                         for i in range(count))
+    return "How would you design a rate limiter for a public API?"
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r'\S+\s*|\s+', text)
+
+
+def make_handler(latency: LatencyModel, stall_after: int = None, keepalive: float = 0.0):
+    class MockProviderHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            text = canned_response(request.get('messages', []))
+            tokens = _tokens(text)
+
+            time.sleep(latency.first_token_delay())
+            if latency.should_fail():
+                self._send_json(503, {"error": {"message": "mock provider overloaded"}})
+                return
+
+            if not request.get('stream'):
+                time.sleep(sum(latency.token_delay() for _ in tokens))
+                self._send_json(200, {
+                    "model": request.get('model', 'mock'),
+                    "choices": [{"message": {"role": "assistant", "content": text}}],
+                    "usage": {"completion_tokens": len(tokens)}
+                })
+                return
+
+            # Chunked like real providers, so clients see each event as it is written
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                for i, token in enumerate(tokens):
+                    if stall_after is not None and i >= stall_after:
+                        # Keep the connection open without producing tokens
+                        while True:
+                            time.sleep(keepalive or 1.0)
+                            if keepalive:
+                                self._write_chunk(b": keep-alive\n\n")
+                    chunk = {"choices": [{"delta": {"content": token}}]}
+                    self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                    time.sleep(latency.token_delay())
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+        def _write_chunk(self, data: bytes) -> None:
+            self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+
+    return MockProviderHandler
+
+
+class MockProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hang up mid-stream on purpose (early exit, stall timeouts)
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+def serve(port: int = 8765, latency: LatencyModel = None, stall_after: int = None,
+          keepalive: float = 0.0, background: bool = False) -> ThreadingHTTPServer:
+    """Start the mock server; with background=True it runs in a daemon thread"""
+    server = MockProviderServer(('127.0.0.1', port),
+                                make_handler(latency or LatencyModel(), stall_after, keepalive))
+    if background:
+        threading.Thread(target=server.serve_forever, name="mock-provider", daemon=True).start()
+    else:
+        print(f"Mock provider listening on http://127.0.0.1:{server.server_address[1]}/v1", file=sys.stderr)
+        server.serve_forever()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock provider")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0, help='time to first token')
+    parser.add_argument('--token-ms', type=float, default=0, help='time per streamed token')
+    parser.add_argument('--jitter', type=float, default=0.0, help='relative jitter, e.g. 0.3 for +/-30%%')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--stall-after', type=int, help='stop streaming after this many tokens')
+    parser.add_argument('--keepalive', type=float, default=0.0, help='seconds between keep-alive comments while stalled')
+    args = parser.parse_args()
+
+    latency = LatencyModel(args.latency_ms, args.token_ms, args.jitter, args.error_rate)
+    serve(args.port, latency, args.stall_after, args.keepalive)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Trace Replay Load Generator
+Replays captured question-generation and interview-analysis payloads at a controlled rate
+
+Each trace record is either a question request ({"role", "experience", "count", "language"})
+or an interview ({"answers": [...]}). Records may carry an "offset" in seconds (or an ISO
+"timestamp") used when replaying with --speedup. Arrivals are open-loop: requests are
+dispatched on schedule whether or not earlier ones finished, and latency is measured from
+the scheduled time so queueing delay is included.
+
+Usage:
+    python lib/benchmarks/replay_load.py trace.jsonl --rate 5 --duration 60 --mock-latency-ms 800
+    python lib/benchmarks/replay_load.py trace.jsonl --speedup 10 --mode cli
+    python lib/benchmarks/replay_load.py trace.jsonl --rates 1,2,4,8,16 --duration 30 --slo-ms 5000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+LIB_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(LIB_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from stream_input import iter_documents
+
+ANALYZER_SCRIPT = LIB_DIR / 'ai_interview_analyzer.py'
+QUESTIONS_SCRIPT = LIB_DIR / 'ai_openrouter_api.py'
+
+
+def load_trace(paths: List[str]) -> List[Dict[str, Any]]:
+    """Read records from JSONL, concatenated JSON or single-document files"""
+    records = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            for record in iter_documents(f):
+                if isinstance(record, dict):
+                    records.append(record)
+    return records
+
+
+def _record_offset(record: Dict[str, Any], first: Optional[float]) -> Optional[float]:
+    if 'offset' in record:
+        return float(record['offset'])
+    timestamp = record.get('timestamp') or record.get('savedAt')
+    if timestamp and first is not None:
+        try:
+            return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp() - first
+        except ValueError:
+            return None
+    return None
+
+
+def build_schedule(records: List[Dict[str, Any]], rate: Optional[float] = None, speedup: float = 1.0,
+                   duration: Optional[float] = None, seed: int = 0) -> List[Tuple[float, Dict[str, Any]]]:
+    """Arrival times for the replay.
+
+    With a rate, arrivals are Poisson at that rate, cycling through the trace for
+    ``duration`` seconds (or one pass). Otherwise the trace's own offsets are used,
+    compressed by ``speedup``.
+    """
+    if not records:
+        return []
+    if rate:
+        rng = random.Random(seed)
+        schedule = []
+        now = 0.0
+        i = 0
+        limit = duration if duration else None
+        while True:
+            now += rng.expovariate(rate)
+            if limit is not None and now > limit:
+                break
+            if limit is None and i >= len(records):
+                break
+            schedule.append((now, records[i % len(records)]))
+            i += 1
+        return schedule
+
+    first = None
+    for record in records:
+        timestamp = record.get('timestamp') or record.get('savedAt')
+        if timestamp and 'offset' not in record:
+            try:
+                first = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+                break
+            except ValueError:
+                continue
+    schedule = []
+    for i, record in enumerate(records):
+        offset = _record_offset(record, first)
+        # Records without timing arrive one second apart in trace time
+        schedule.append(((offset if offset is not None else float(i)) / speedup, record))
+    schedule.sort(key=lambda item: item[0])
+    base = schedule[0][0]
+    return [(offset - base, record) for offset, record in schedule]
+
+
+def _count_fallbacks(kind: str, result: Dict[str, Any]) -> Tuple[int, int]:
+    """(fallback items, total items) in a result"""
+    items = result.get('questions', []) if kind == 'questions' else result.get('questionAnalysis', [])
+    return sum(1 for item in items if item.get('source') == 'fallback'), len(items)
+
+
+class Replayer:
+    """Runs one record either in-process or through the CLI scripts.
+
+    In-process, each replay thread gets its own analyzer, as in ``AnalysisWorkerPool``,
+    since analyzer state (cohort statistics, store writer) is not safe to share
+    between concurrent analyses.
+    """
+
+    def __init__(self, mode: str = 'inprocess', timeout: float = 300.0):
+        self.mode = mode
+        self.timeout = timeout
+        self._local = threading.local()
+        self._analyzers = []
+        self._analyzers_lock = threading.Lock()
+
+    def _get_analyzer(self):
+        analyzer = getattr(self._local, 'analyzer', None)
+        if analyzer is None:
+            from ai_interview_analyzer import AIInterviewAnalyzer
+            analyzer = self._local.analyzer = AIInterviewAnalyzer()
+            with self._analyzers_lock:
+                self._analyzers.append(analyzer)
+        return analyzer
+
+    def run(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        kind = 'analysis' if 'answers' in record else 'questions'
+        try:
+            if self.mode == 'cli':
+                result = self._run_cli(kind, record)
+            elif kind == 'analysis':
+                result = self._get_analyzer().analyze_interview(record)
+            else:
+                from ai_openrouter_api import generate_mixed_questions
+                result = generate_mixed_questions(record)
+        except Exception as e:
+            return {'kind': kind, 'ok': False, 'error': str(e), 'fallbacks': 0, 'items': 0}
+
+        if not isinstance(result, dict) or 'error' in result:
+            error = result.get('error') if isinstance(result, dict) else 'invalid output'
+            return {'kind': kind, 'ok': False, 'error': error, 'fallbacks': 0, 'items': 0}
+        fallbacks, items = _count_fallbacks(kind, result)
+        return {'kind': kind, 'ok': True, 'fallbacks': fallbacks, 'items': items,
+                'inference': result.get('metadata', {}).get('inference', [])}
+
+    def _run_cli(self, kind: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        script = ANALYZER_SCRIPT if kind == 'analysis' else QUESTIONS_SCRIPT
+        completed = subprocess.run([sys.executable, str(script)], input=json.dumps(record).encode('utf-8'),
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=self.timeout)
+        outputs = list(iter_documents(io.BytesIO(completed.stdout)))
+        if not outputs:
+            raise RuntimeError(f"no output (exit code {completed.returncode})")
+        return outputs[0]
+
+    def close(self) -> None:
+        with self._analyzers_lock:
+            analyzers, self._analyzers = self._analyzers, []
+        for analyzer in analyzers:
+            analyzer.close()
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of pre-sorted values"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values) / 100) - 1))
+    return sorted_values[index]
+
+
+def summarize_inference(results: List[Dict[str, Any]], wall_seconds: float) -> List[Dict[str, Any]]:
+    """Completion tokens/sec per provider and model, from the stats each request reports.
+
+    ``tokens_per_second`` is the speed of a single generation; ``tokens_per_wall_second``
+    is the throughput the backend sustained across concurrent requests.
+    """
+    totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+    for result in results:
+        for stats in result.get('inference', []):
+            total = totals.setdefault((stats['provider'], stats['model']),
+                                      {'requests': 0, 'completion_tokens': 0, 'generation_seconds': 0.0})
+            for field in total:
+                total[field] += stats.get(field, 0)
+    return [{
+        'provider': provider,
+        'model': model,
+        'requests': total['requests'],
+        'completion_tokens': total['completion_tokens'],
+        'tokens_per_second': round(total['completion_tokens'] / total['generation_seconds'], 2)
+        if total['generation_seconds'] else 0.0,
+        'tokens_per_wall_second': round(total['completion_tokens'] / wall_seconds, 2) if wall_seconds else 0.0
+    } for (provider, model), total in sorted(totals.items())]
+
+
+def summarize(results: List[Dict[str, Any]], wall_seconds: float, target_rate: Optional[float],
+              offered_rate: float) -> Dict[str, Any]:
+    """Latency percentiles, throughput, error and fallback rates per request kind"""
+    summary = {
+        'requests': len(results),
+        'wall_seconds': round(wall_seconds, 2),
+        'target_rate': target_rate,
+        'offered_rate': round(offered_rate, 3),
+        'throughput': round(len(results) / wall_seconds, 3) if wall_seconds else 0.0,
+        'kinds': {}
+    }
+    for kind in sorted({r['kind'] for r in results}):
+        subset = [r for r in results if r['kind'] == kind]
+        latencies = sorted(r['latency'] * 1000 for r in subset)
+        errors = sum(1 for r in subset if not r['ok'])
+        items = sum(r['items'] for r in subset)
+        summary['kinds'][kind] = {
+            'requests': len(subset),
+            'error_rate': round(errors / len(subset), 4),
+            'fallback_rate': round(sum(r['fallbacks'] for r in subset) / items, 4) if items else 0.0,
+            'latency_ms': {f'p{q}': round(percentile(latencies, q), 1) for q in (50, 90, 95, 99)},
+            'max_latency_ms': round(latencies[-1], 1),
+            'mean_queue_ms': round(sum(r['queue'] for r in subset) / len(subset) * 1000, 1)
+        }
+    # Only question requests report inference stats; the analyzer logs its own at exit
+    summary['inference'] = summarize_inference(results, wall_seconds)
+    return summary
+
+
+def replay(schedule: List[Tuple[float, Dict[str, Any]]], replayer: Replayer, max_workers: int = 256,
+           target_rate: Optional[float] = None) -> Dict[str, Any]:
+    """Dispatch the schedule open-loop and summarize the outcomes"""
+    results = []
+    results_lock = threading.Lock()
+
+    def task(scheduled_at: float, record: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        outcome = replayer.run(record)
+        finished = time.perf_counter()
+        outcome['latency'] = finished - scheduled_at
+        outcome['queue'] = started - scheduled_at
+        with results_lock:
+            results.append(outcome)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="replay") as executor:
+        for offset, record in schedule:
+            scheduled_at = start + offset
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(task, scheduled_at, record)
+    # Realized arrival rate; Poisson sampling drifts from the target on short runs
+    span = schedule[-1][0] if schedule and schedule[-1][0] > 0 else 1.0
+    return summarize(results, time.perf_counter() - start, target_rate, len(schedule) / span)
+
+
+def find_saturation(steps: List[Dict[str, Any]], slo_ms: Optional[float],
+                    min_efficiency: float = 0.9) -> Optional[float]:
+    """First target rate where throughput falls behind, errors appear or p95 breaks the SLO.
+
+    Throughput includes the drain after the last arrival, so runs should last well
+    beyond the typical request latency for the efficiency check to be meaningful.
+    """
+    for step in steps:
+        if step['throughput'] < step['offered_rate'] * min_efficiency:
+            return step['target_rate']
+        for kind in step['kinds'].values():
+            if kind['error_rate'] > 0.01:
+                return step['target_rate']
+            if slo_ms and kind['latency_ms']['p95'] > slo_ms:
+                return step['target_rate']
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a request trace against the question generator and analyzer")
+    parser.add_argument('trace', nargs='+', help='JSONL / JSON files of captured payloads')
+    parser.add_argument('--mode', choices=['inprocess', 'cli'], default='inprocess')
+    parser.add_argument('--rate', type=float, help='open-loop Poisson arrival rate (requests/s)')
+    parser.add_argument('--rates', help='comma-separated rates to step through to find saturation')
+    parser.add_argument('--speedup', type=float, default=1.0, help='compress trace offsets by this factor')
+    parser.add_argument('--duration', type=float, help='seconds per run when using --rate/--rates')
+    parser.add_argument('--workers', type=int, default=256, help='max concurrent in-flight requests')
+    parser.add_argument('--slo-ms', type=float, help='p95 latency objective used for saturation')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--persist', action='store_true', help='keep analysis store and cohort stats enabled')
+    parser.add_argument('--verbose', action='store_true', help='show the scripts\' stderr logging')
+    mock = parser.add_argument_group('mock provider')
+    mock.add_argument('--mock', action='store_true', help='serve a local mock provider instead of the real API')
+    mock.add_argument('--mock-latency-ms', type=float, default=0)
+    mock.add_argument('--mock-token-ms', type=float, default=0)
+    mock.add_argument('--mock-jitter', type=float, default=0.0)
+    mock.add_argument('--mock-error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    if any(value for value in (args.mock_latency_ms, args.mock_token_ms, args.mock_error_rate)):
+        args.mock = True
+    if args.mock:
+        from mock_provider import LatencyModel, serve
+        server = serve(0, LatencyModel(args.mock_latency_ms, args.mock_token_ms, args.mock_jitter,
+                                       args.mock_error_rate, args.seed), background=True)
+        os.environ['OPENROUTER_BASE_URL'] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        os.environ.setdefault('OPENROUTER_API_KEY', 'mock')
+        os.environ['USE_OPENAI_INSTEAD'] = 'false'
+    if not args.persist:
+        os.environ['ANALYSIS_STORE_ENABLED'] = 'false'
+        os.environ['COHORT_STATS_ENABLED'] = 'false'
+
+    records = load_trace(args.trace)
+    if not records:
+        parser.error("trace contains no records")
+
+    rates = [float(rate) for rate in args.rates.split(',')] if args.rates else [args.rate]
+    steps = []
+    replayer = Replayer(args.mode)
+    devnull = open(os.devnull, 'w')
+    try:
+        for rate in rates:
+            schedule = build_schedule(records, rate, args.speedup, args.duration, args.seed)
+            timing = f"{rate}/s" if rate else f"trace timing x{args.speedup}"
+            print(f"Replaying {len(schedule)} requests at {timing}...", file=sys.stderr)
+            # The scripts log every request to stderr; keep the progress output readable
+            with contextlib.nullcontext() if args.verbose else contextlib.redirect_stderr(devnull):
+                step = replay(schedule, replayer, args.workers, rate)
+            steps.append(step)
+            print(json.dumps(step), file=sys.stderr)
+    finally:
+        with contextlib.nullcontext() if args.verbose else contextlib.redirect_stderr(devnull):
+            replayer.close()
+        devnull.close()
+
+    report = {'mode': args.mode, 'trace_records': len(records), 'steps': steps}
+    if len(steps) > 1:
+        report['saturation_rate'] = find_saturation(steps, args.slo_ms)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
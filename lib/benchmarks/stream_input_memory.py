@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Streaming Input Memory Benchmark
+Compares peak memory of stream_input against json.loads on a large synthetic interview payload
+
+--analyze also runs the whole analyzer over the payload against the in-process mock
+provider, so memory held by the analysis (not just the parser) is measured. It makes
+two upstream calls per answer, so use a smaller payload.
+
+Usage:
+    python lib/benchmarks/stream_input_memory.py --size-mb 300
+    python lib/benchmarks/stream_input_memory.py --size-mb 300 --ndjson --compare
+    python lib/benchmarks/stream_input_memory.py --size-mb 20 --answer-kb 64 --analyze
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from stream_input import iter_interviews
+
+WORDS = ("design scale cache latency queue database index shard replica deploy rollback "
+         "monitor alert incident review test refactor api contract schema migration").split()
+
+
+def _answer(i: int, answer_bytes: int) -> dict:
+    words = []
+    size = 0
+    while size < answer_bytes:
+        word = WORDS[(i + len(words)) % len(WORDS)]
+        words.append(word)
+        size += len(word) + 1
+    return {
+        "questionId": str(i),
+        "questionText": f"Question {i}: how would you approach this \"production\" problem?",
+        "answerText": ' '.join(words),
+        "category": "Technical",
+        "recordingDuration": 42,
+        "timestamp": "2025-08-12T18:44:13.877Z"
+    }
+
+
+def generate(path: str, size_mb: int, answer_kb: int, ndjson: bool) -> int:
+    """Write a synthetic payload of roughly size_mb; returns the number of answers"""
+    target = size_mb * 1024 * 1024
+    written = 0
+    count = 0
+    header = '{"userId": "bench", "role": "Backend Engineer", "experience": "5+ years", "language": "en", "answers": ['
+    with open(path, 'w', encoding='utf-8') as f:
+        if not ndjson:
+            f.write(header)
+        while written < target:
+            answer = json.dumps(_answer(count, answer_kb * 1024))
+            if ndjson:
+                # Many small interviews, one per line
+                line = header + answer + ']}\n'
+            else:
+                line = (',' if count else '') + answer
+            f.write(line)
+            written += len(line)
+            count += 1
+        if not ndjson:
+            f.write('], "interviewDuration": 55}')
+    return count
+
+
+def _mock_analyzer():
+    """Analyzer wired to a mock provider in this process, with persistence off"""
+    from mock_provider import serve
+    server = serve(0, background=True)
+    os.environ.update({
+        'OPENROUTER_BASE_URL': f"http://127.0.0.1:{server.server_address[1]}/v1",
+        'OPENROUTER_API_KEY': 'benchmark',
+        'USE_OPENAI_INSTEAD': 'false',
+        'ANALYSIS_STORE_ENABLED': 'false',
+        'COHORT_STATS_ENABLED': 'false',
+        'LOG_LEVEL': 'WARNING'
+    })
+    from ai_interview_analyzer import AIInterviewAnalyzer
+    return AIInterviewAnalyzer()
+
+
+def run_mode(mode: str, path: str) -> dict:
+    """Parse (and with mode 'analyze', analyze) the payload in this process and report time and peak memory"""
+    analyzer = _mock_analyzer() if mode == 'analyze' else None
+    tracemalloc.start()
+    start = time.perf_counter()
+    answers = 0
+    documents = 0
+    with open(path, 'rb') as f:
+        if mode == 'stream':
+            for document in iter_interviews(f):
+                documents += 1
+                for _ in document.answers():
+                    answers += 1
+        elif mode == 'analyze':
+            for document in iter_interviews(f):
+                documents += 1
+                analyzer.analyze_interview_stream(document)
+                answers += document.answer_count
+        else:
+            data = json.loads(f.read())
+            documents = 1
+            answers = len(data['answers'])
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        'mode': mode,
+        'documents': documents,
+        'answers': answers,
+        'seconds': round(elapsed, 2),
+        'peak_traced_mb': round(peak / 1024 / 1024, 1)
+    }
+    try:
+        import resource
+        result['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:
+        pass
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--size-mb', type=int, default=300)
+    parser.add_argument('--answer-kb', type=int, default=4)
+    parser.add_argument('--ndjson', action='store_true', help='one small interview per line instead of one huge one')
+    parser.add_argument('--compare', action='store_true', help='also measure json.loads (single document only)')
+    parser.add_argument('--analyze', action='store_true', help='also run the analyzer against a mock provider')
+    parser.add_argument('--input', help='use an existing payload instead of generating one')
+    parser.add_argument('--mode', choices=['stream', 'json', 'analyze'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.input)))
+        return
+
+    path = args.input
+    cleanup = False
+    if not path:
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        cleanup = True
+        start = time.perf_counter()
+        count = generate(path, args.size_mb, args.answer_kb, args.ndjson)
+        print(f"Generated {os.path.getsize(path) / 1024 / 1024:.0f} MB with {count} answers "
+              f"in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    try:
+        modes = ['stream'] + (['json'] if args.compare and not args.ndjson else []) + (['analyze'] if args.analyze else [])
+        for mode in modes:
+            # Separate processes so max RSS is not shared between modes
+            output = subprocess.run([sys.executable, __file__, '--mode', mode, '--input', path],
+                                    check=True, capture_output=True, text=True).stdout
+            print(output.strip())
+    finally:
+        if cleanup:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+"""
+Cohort Statistics
+Streaming score percentiles per role, experience and language using mergeable t-digests
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from structured_logging import get_logger
+
+logger = get_logger('cohort')
+
+DEFAULT_STATS_PATH = Path(__file__).parent.parent / 'data' / 'interviews' / 'cohort_stats.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cohorts (
+    key TEXT PRIMARY KEY,
+    digests_json TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+METRICS = ('overall', 'technical', 'communication', 'completeness', 'confidence')
+
+
+class TDigest:
+    """Merging t-digest: bounded-size quantile sketch that can be merged across processes"""
+
+    def __init__(self, compression: float = 100):
+        self.compression = compression
+        self.centroids: List[Tuple[float, float]] = []
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[Tuple[float, float]] = []
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        value = float(value)
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= self.compression * 5:
+            self._compress()
+
+    def merge(self, other: 'TDigest') -> None:
+        """Fold another digest into this one"""
+        if not other.count:
+            return
+        self._buffer.extend(other.centroids)
+        self._buffer.extend(other._buffer)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inverse(self, k: float) -> float:
+        angle = min(math.pi / 2, k * 2 * math.pi / self.compression)
+        return (math.sin(angle) + 1) / 2
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        points = sorted(self.centroids + self._buffer)
+        self._buffer = []
+        total = sum(weight for _, weight in points)
+
+        merged = []
+        so_far = 0.0
+        q_limit = self._k_inverse(self._k(0.0) + 1)
+        mean, weight = points[0]
+        for next_mean, next_weight in points[1:]:
+            if (so_far + weight + next_weight) / total <= q_limit:
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+            else:
+                merged.append((mean, weight))
+                so_far += weight
+                q_limit = self._k_inverse(self._k(so_far / total) + 1)
+                mean, weight = next_mean, next_weight
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile q (0.0 - 1.0)"""
+        self._compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+        target = q * self.count
+        cumulative = 0.0
+        previous_center, previous_mean = 0.0, self.min
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2
+            if target <= center:
+                span = center - previous_center
+                fraction = (target - previous_center) / span if span else 0.0
+                return previous_mean + (mean - previous_mean) * fraction
+            cumulative += weight
+            previous_center, previous_mean = center, mean
+        span = self.count - previous_center
+        fraction = (target - previous_center) / span if span else 1.0
+        return previous_mean + (self.max - previous_mean) * min(1.0, fraction)
+
+    def cdf(self, value: float) -> Optional[float]:
+        """Estimated fraction of observations at or below value"""
+        self._compress()
+        if not self.centroids:
+            return None
+        if value < self.min:
+            return 0.0
+        if value >= self.max:
+            return 1.0
+        cumulative = 0.0
+        previous_center, previous_mean = 0.0, self.min
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2
+            if value < mean:
+                span = mean - previous_mean
+                fraction = (value - previous_mean) / span if span else 1.0
+                return (previous_center + (center - previous_center) * fraction) / self.count
+            cumulative += weight
+            previous_center, previous_mean = center, mean
+        span = self.max - previous_mean
+        fraction = (value - previous_mean) / span if span else 1.0
+        return (previous_center + (self.count - previous_center) * fraction) / self.count
+
+    def to_dict(self) -> Dict[str, Any]:
+        self._compress()
+        return {
+            'compression': self.compression,
+            'count': self.count,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'centroids': [[round(mean, 4), weight] for mean, weight in self.centroids]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TDigest':
+        digest = cls(data.get('compression', 100))
+        digest.centroids = [(mean, weight) for mean, weight in data.get('centroids', [])]
+        digest.count = data.get('count', 0.0)
+        if digest.count:
+            digest.min = data['min']
+            digest.max = data['max']
+        return digest
+
+
+def _cohort_keys(role: str, experience: str, language: str) -> List[Tuple[str, str]]:
+    """Cohorts an interview belongs to, most specific first"""
+    role = ' '.join(role.split()).lower()
+    experience = ' '.join(experience.split()).lower()
+    language = language.lower()
+    return [
+        (f"role={role}|experience={experience}|language={language}", f"{role}, {experience}, {language}"),
+        (f"role={role}|experience={experience}", f"{role}, {experience}"),
+        (f"role={role}", role),
+        ("all", "all candidates")
+    ]
+
+
+def _digests_to_json(metrics: Dict[str, TDigest]) -> str:
+    return json.dumps({metric: digest.to_dict() for metric, digest in metrics.items()}, separators=(',', ':'))
+
+
+def _digests_from_json(text: str) -> Dict[str, TDigest]:
+    return {metric: TDigest.from_dict(d) for metric, d in json.loads(text).items()}
+
+
+class CohortStats:
+    """Per-cohort t-digests for the overall score and each breakdown dimension.
+
+    Cohorts are rows in a shared SQLite file and only the four an interview
+    belongs to are read, so cost does not grow with the number of cohorts. New
+    observations are kept in a separate delta that ``save()`` merges into the
+    stored rows inside one write transaction; SQLite's locking serializes
+    concurrent savers and is released by the OS if a process dies. ``max_cohorts``
+    caps both the number of stored rows and the least-recently-used cohorts kept
+    in memory.
+    """
+
+    def __init__(self, path: Optional[str] = None, compression: float = 100, max_cohorts: int = 5000,
+                 min_samples: int = 30):
+        self.path = Path(path or os.getenv('COHORT_STATS_PATH', DEFAULT_STATS_PATH))
+        self.compression = compression
+        self.max_cohorts = max_cohorts
+        self.min_samples = min_samples
+        self.cohorts: "OrderedDict[str, Dict[str, TDigest]]" = OrderedDict()
+        self._delta: Dict[str, Dict[str, TDigest]] = {}
+        self._local = threading.local()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection in autocommit mode; save() uses an explicit transaction"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _read(conn: sqlite3.Connection, keys: List[str]) -> Dict[str, Dict[str, TDigest]]:
+        rows = conn.execute(
+            f"SELECT key, digests_json FROM cohorts WHERE key IN ({', '.join('?' * len(keys))})", keys).fetchall()
+        cohorts = {}
+        for key, digests_json in rows:
+            try:
+                cohorts[key] = _digests_from_json(digests_json)
+            except Exception as e:
+                logger.warning("Ignoring unreadable cohort stats for %s: %s", key, e)
+        return cohorts
+
+    def _ensure_loaded(self, keys: List[str]) -> None:
+        missing = [key for key in keys if key not in self.cohorts]
+        for key in keys:
+            if key in self.cohorts:
+                self.cohorts.move_to_end(key)
+        if not missing:
+            return
+        stored = self._read(self._connect(), missing)
+        for key in missing:
+            metrics = stored.get(key, {})
+            # Observations recorded before the first read of this cohort still count
+            self._merge_into(metrics, self._delta.get(key, {}))
+            self._cache(key, metrics)
+
+    def _cache(self, key: str, metrics: Dict[str, TDigest]) -> None:
+        """Keep a cohort in memory, evicting the least recently used beyond ``max_cohorts``"""
+        self.cohorts[key] = metrics
+        self.cohorts.move_to_end(key)
+        # An interview touches four cohorts, which must all stay cached while it is scored
+        while len(self.cohorts) > max(self.max_cohorts, 4):
+            self.cohorts.popitem(last=False)
+
+    @staticmethod
+    def _merge_into(target: Dict[str, TDigest], source: Dict[str, TDigest]) -> None:
+        for metric, digest in source.items():
+            target.setdefault(metric, TDigest(digest.compression)).merge(digest)
+
+    @staticmethod
+    def scores_from_result(result: Dict[str, Any]) -> Dict[str, float]:
+        """Metric values from an analyzer result"""
+        breakdown = result.get('breakdown', {})
+        scores = {'overall': result.get('overallScore')}
+        for metric in METRICS[1:]:
+            scores[metric] = breakdown.get(metric)
+        return {metric: float(value) for metric, value in scores.items() if value is not None}
+
+    def record(self, role: str, experience: str, language: str, scores: Dict[str, float]) -> None:
+        """Add one interview's scores to every cohort it belongs to"""
+        keys = [key for key, _ in _cohort_keys(role, experience, language)]
+        self._ensure_loaded(keys)
+        for key in keys:
+            for target in (self.cohorts, self._delta):
+                metrics = target.setdefault(key, {})
+                for metric, value in scores.items():
+                    metrics.setdefault(metric, TDigest(self.compression)).add(value)
+
+    def benchmark(self, role: str, experience: str, language: str, scores: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        """Percentile of each score within the most specific cohort with enough samples"""
+        cohort_keys = _cohort_keys(role, experience, language)
+        self._ensure_loaded([key for key, _ in cohort_keys])
+        for key, label in cohort_keys:
+            metrics = self.cohorts.get(key)
+            if not metrics or metrics.get('overall', TDigest()).count < self.min_samples:
+                continue
+            percentiles = {}
+            for metric, value in scores.items():
+                digest = metrics.get(metric)
+                if digest and digest.count:
+                    percentiles[metric] = round(digest.cdf(value) * 100)
+            return {
+                'cohort': label,
+                'sampleSize': int(metrics['overall'].count),
+                'percentiles': percentiles
+            }
+        return None
+
+    def merge(self, other: 'CohortStats') -> None:
+        """Take over another instance's unsaved observations; the next save() persists them"""
+        for key, metrics in other._delta.items():
+            self._merge_into(self._delta.setdefault(key, {}), metrics)
+            if key in self.cohorts:
+                self._merge_into(self.cohorts[key], metrics)
+        other._delta = {}
+
+    def save(self) -> None:
+        """Merge new observations into the stored cohorts in one write transaction"""
+        if not self._delta:
+            return
+        conn = self._connect()
+        keys = list(self._delta)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            merged = self._read(conn, keys)
+            room = self.max_cohorts - conn.execute("SELECT COUNT(*) FROM cohorts").fetchone()[0]
+            now = time.time()
+            rows = []
+            for key in keys:
+                if key not in merged:
+                    if room <= 0:
+                        continue
+                    room -= 1
+                    merged[key] = {}
+                self._merge_into(merged[key], self._delta[key])
+                rows.append((key, _digests_to_json(merged[key]), now))
+            conn.executemany(
+                "INSERT INTO cohorts (key, digests_json, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET digests_json = excluded.digests_json, "
+                "updated_at = excluded.updated_at", rows)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        # The saved rows include other processes' observations, so they replace the cached copies;
+        # cohorts that did not fit under max_cohorts are not kept either
+        for key in keys:
+            if key in merged:
+                if key in self.cohorts:
+                    self.cohorts[key] = merged[key]
+            else:
+                self.cohorts.pop(key, None)
+        self._delta = {}
@@ -0,0 +1,574 @@
+"""
+Inference Providers
+Chat-completion backends (OpenRouter, OpenAI, local CPU model) with per-operation routing
+"""
+
+import codecs
+import copy
+import hashlib
+import json
+import os
+import time
+import threading
+import requests
+from concurrent.futures import Future
+from typing import List, Dict, Any, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from model_tiers import ModelTiering
+from profiling import span
+from structured_logging import get_logger, redact
+
+logger = get_logger('inference')
+
+
+class StreamStalledError(RuntimeError):
+    """No tokens arrived within the inter-token timeout"""
+
+
+class Completion(NamedTuple):
+    """Completion text, the model that produced it, and whether another caller's identical call was shared"""
+    text: str
+    model: str
+    shared: bool = False
+
+
+class CompletionStream:
+    """Iterator of completion deltas that also records which model is streaming.
+
+    Close it (or use it as a context manager) when stopping early, so the HTTP
+    response is released instead of waiting for garbage collection.
+    """
+
+    def __init__(self, deltas: Iterator[str], model: str):
+        self._deltas = deltas
+        self.model = model
+
+    def __iter__(self) -> Iterator[str]:
+        return self._deltas
+
+    def close(self) -> None:
+        close = getattr(self._deltas, 'close', None)
+        if close is not None:
+            close()
+
+    def __enter__(self) -> 'CompletionStream':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class SingleFlight:
+    """Collapse identical concurrent calls into one in-flight call shared by all waiters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self.requests_saved = 0
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a stable key from JSON-serializable request parts"""
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def do(self, key: str, fn, *args, **kwargs) -> Tuple[Any, bool]:
+        """Run fn once per key at a time; concurrent callers with the same key share its result.
+
+        Returns ``(result, shared)``, where ``shared`` is true for callers that waited
+        on another caller's call instead of making their own.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.requests_saved += 1
+        
+        if not leader:
+            with span('coalesced_wait'):
+                return future.result(), True
+        
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+class InferenceProvider:
+    """Base class for a chat-completion backend"""
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+        self._stats_lock = threading.Lock()
+        self.request_count = 0
+        self.completion_tokens = 0
+        self.generation_seconds = 0.0
+
+    def complete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> str:
+        """Return the completion text for a list of chat messages"""
+        start = time.perf_counter()
+        text, tokens = self._complete(messages, max_tokens, temperature)
+        self._record(tokens if tokens is not None else _estimate_tokens(text), time.perf_counter() - start)
+        return text
+
+    def _complete(self, messages: List[Dict[str, str]], max_tokens: int,
+                  temperature: float) -> Tuple[str, Optional[int]]:
+        """Return (text, completion tokens or None if the backend did not report them)"""
+        raise NotImplementedError
+
+    def stream(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+               inter_token_timeout: float = 10.0) -> Iterator[str]:
+        """Yield completion text deltas as they arrive"""
+        start = time.perf_counter()
+        parts = []
+        for delta in self._stream(messages, max_tokens, temperature, inter_token_timeout):
+            parts.append(delta)
+            yield delta
+        self._record(_estimate_tokens(''.join(parts)), time.perf_counter() - start)
+
+    def _stream(self, messages, max_tokens, temperature, inter_token_timeout) -> Iterator[str]:
+        """Backends without streaming return the whole completion as one delta"""
+        text, _ = self._complete(messages, max_tokens, temperature)
+        yield text
+
+    def with_model(self, model: str) -> 'InferenceProvider':
+        """The same backend and credentials serving another model, with its own counters"""
+        if model == self.model:
+            return self
+        variant = copy.copy(self)
+        InferenceProvider.__init__(variant, model)
+        return variant
+
+    def _record(self, tokens: int, seconds: float) -> None:
+        with self._stats_lock:
+            self.request_count += 1
+            self.completion_tokens += tokens
+            self.generation_seconds += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """Throughput counters, including completion tokens per second"""
+        with self._stats_lock:
+            seconds = self.generation_seconds
+            return {
+                "provider": self.name,
+                "model": self.model,
+                "requests": self.request_count,
+                "completion_tokens": self.completion_tokens,
+                "generation_seconds": round(seconds, 3),
+                "tokens_per_second": round(self.completion_tokens / seconds, 2) if seconds else 0.0
+            }
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count for backends that do not report usage"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def _parse_chat_response(result: Dict[str, Any]) -> Tuple[str, Optional[int]]:
+    """Extract (content, completion tokens) from an OpenAI-style response body"""
+    if 'choices' in result and len(result['choices']) > 0:
+        tokens = (result.get('usage') or {}).get('completion_tokens')
+        return result['choices'][0]['message']['content'], tokens
+    logger.warning("Unexpected response format (keys: %s)", sorted(result) if isinstance(result, dict) else type(result))
+    logger.debug("Unexpected response body: %s", redact(json.dumps(result, ensure_ascii=False)))
+    raise RuntimeError("Invalid response format from API")
+
+
+def iter_sse_data(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Yield the data of each server-sent event; keep-alive comments yield ''"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    data_lines = []
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            line = line.rstrip('\r')
+            if not line:
+                if data_lines:
+                    yield '\n'.join(data_lines)
+                    data_lines = []
+            elif line.startswith(':'):
+                yield ''
+            elif line.startswith('data:'):
+                value = line[5:]
+                data_lines.append(value[1:] if value.startswith(' ') else value)
+    if data_lines:
+        yield '\n'.join(data_lines)
+
+
+def _stream_chat_completion(url: str, headers: Dict[str, str], data: Dict[str, Any],
+                            inter_token_timeout: float) -> Iterator[str]:
+    """POST a streaming chat completion and yield content deltas.
+
+    The socket read timeout and the time since the last content delta are both bound
+    by inter_token_timeout, so a stalled stream fails fast instead of waiting for a
+    whole-request timeout; keep-alive comments do not count as progress.
+    """
+    try:
+        response = requests.post(url, headers=headers, json=dict(data, stream=True), stream=True,
+                                 timeout=(10, inter_token_timeout))
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        raise RuntimeError(f"API request failed: {e}")
+
+    last_token = time.monotonic()
+    try:
+        for event in iter_sse_data(response.iter_content(chunk_size=None)):
+            if event == '[DONE]':
+                return
+            delta = None
+            if event:
+                payload = json.loads(event)
+                if payload.get('error'):
+                    raise RuntimeError(f"Stream error: {payload['error']}")
+                choices = payload.get('choices') or [{}]
+                delta = (choices[0].get('delta') or {}).get('content')
+            if delta:
+                last_token = time.monotonic()
+                yield delta
+            elif time.monotonic() - last_token > inter_token_timeout:
+                raise StreamStalledError(f"No tokens received for {inter_token_timeout}s")
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        raise StreamStalledError(f"Stream stalled: {e}")
+    finally:
+        response.close()
+
+
+class OpenRouterProvider(InferenceProvider):
+    """OpenRouter chat completions over HTTPS"""
+
+    name = "openrouter"
+
+    def __init__(self, api_key: str, model: str, base_url: str = 'https://openrouter.ai/api/v1'):
+        super().__init__(model)
+        self.api_key = api_key
+        self.url = f"{base_url.rstrip('/')}/chat/completions"
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "http://localhost:3000",  # Required by OpenRouter
+            "X-Title": "AI Interview Coach"  # Optional but recommended
+        }
+
+    def _stream(self, messages, max_tokens, temperature, inter_token_timeout):
+        data = {"model": self.model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+        return _stream_chat_completion(self.url, self._headers(), data, inter_token_timeout)
+
+    def _complete(self, messages, max_tokens, temperature):
+        headers = self._headers()
+
+        data = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+
+        try:
+            response = requests.post(self.url,
+                                   headers=headers,
+                                   json=data,
+                                   timeout=30)
+
+            if not response.ok:
+                logger.warning("OpenRouter returned HTTP %s for model %s", response.status_code, self.model)
+                # Error bodies can echo the prompt, so they are redacted like candidate content
+                logger.debug("Error response body: %s", redact(response.text))
+
+            response.raise_for_status()
+            return _parse_chat_response(response.json())
+
+        except requests.exceptions.RequestException as e:
+            logger.warning("Request error: %s", e)
+            raise RuntimeError(f"API request failed: {e}")
+        except Exception as e:
+            logger.warning("General error: %s", e)
+            raise RuntimeError(f"Failed to generate content: {e}")
+
+
+class OpenAIProvider(InferenceProvider):
+    """OpenAI chat completions over HTTPS"""
+
+    name = "openai"
+
+    def __init__(self, api_key: str, model: str = "gpt-4o-mini",
+                 api_url: str = "https://api.openai.com/v1/chat/completions"):
+        super().__init__(model)
+        self.api_key = api_key
+        self.api_url = api_url
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _stream(self, messages, max_tokens, temperature, inter_token_timeout):
+        data = {"model": self.model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+        return _stream_chat_completion(self.api_url, self._headers(), data, inter_token_timeout)
+
+    def _complete(self, messages, max_tokens, temperature):
+        headers = self._headers()
+        data = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        response = requests.post(self.api_url, headers=headers, json=data, timeout=30)
+        response.raise_for_status()
+        return _parse_chat_response(response.json())
+
+
+class LocalProvider(InferenceProvider):
+    """Small quantized model on local CPU.
+
+    Uses a local OpenAI-compatible server when ``LOCAL_LLM_URL`` is set (llama.cpp
+    server, Ollama, vLLM...), otherwise loads a GGUF model in-process with
+    llama-cpp-python. Concurrent requests are only batched by a server (e.g.
+    llama.cpp's ``--parallel`` slots with continuous batching). The in-process model
+    is loaded once per process and runs one generation at a time, since a llama.cpp
+    context is not thread-safe.
+    """
+
+    name = "local"
+
+    _models: Dict[str, Any] = {}
+    _model_locks: Dict[str, threading.Lock] = {}
+    _models_lock = threading.Lock()
+
+    def __init__(self, model: Optional[str] = None, server_url: Optional[str] = None,
+                 model_path: Optional[str] = None):
+        self.server_url = server_url if server_url is not None else os.getenv('LOCAL_LLM_URL', '')
+        self.model_path = model_path if model_path is not None else os.getenv('LOCAL_LLM_MODEL_PATH', '')
+        default_model = os.path.basename(self.model_path) if self.model_path else 'local-model'
+        super().__init__(model or os.getenv('LOCAL_LLM_MODEL', default_model))
+
+        if not self.server_url and not self.model_path:
+            raise RuntimeError("Local inference needs LOCAL_LLM_URL or LOCAL_LLM_MODEL_PATH")
+
+        self.timeout = float(os.getenv('LOCAL_LLM_TIMEOUT', '60'))
+
+    def complete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> str:
+        if self.server_url:
+            return super().complete(messages, max_tokens, temperature)
+
+        model, lock = self._load_model()
+        with lock:
+            # Timed inside the lock so waiting for the model does not skew tokens/sec
+            start = time.perf_counter()
+            try:
+                result = model.create_chat_completion(messages=messages, max_tokens=max_tokens,
+                                                      temperature=temperature)
+            except Exception as e:
+                raise RuntimeError(f"Local inference failed: {e}")
+            elapsed = time.perf_counter() - start
+        text, tokens = _parse_chat_response(result)
+        self._record(tokens if tokens is not None else _estimate_tokens(text), elapsed)
+        return text
+
+    def _complete(self, messages, max_tokens, temperature):
+        return self._complete_via_server(messages, max_tokens, temperature)
+
+    def with_model(self, model: str) -> InferenceProvider:
+        # The in-process model is fixed by LOCAL_LLM_MODEL_PATH
+        return super().with_model(model) if self.server_url else self
+
+    def stream(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+               inter_token_timeout: float = 10.0) -> Iterator[str]:
+        if self.server_url:
+            return super().stream(messages, max_tokens, temperature, inter_token_timeout)
+        # In-process generation arrives as one delta
+        return iter([self.complete(messages, max_tokens, temperature)])
+
+    def _stream(self, messages, max_tokens, temperature, inter_token_timeout):
+        data = {"model": self.model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+        url = f"{self.server_url.rstrip('/')}/chat/completions"
+        return _stream_chat_completion(url, {"Content-Type": "application/json"}, data, inter_token_timeout)
+
+    def _complete_via_server(self, messages, max_tokens, temperature):
+        """Concurrent requests reach the server together so it can batch them"""
+        data = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        url = f"{self.server_url.rstrip('/')}/chat/completions"
+        try:
+            response = requests.post(url, json=data, timeout=self.timeout)
+            response.raise_for_status()
+            return _parse_chat_response(response.json())
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(f"Local inference request failed: {e}")
+
+    def _load_model(self) -> Tuple[Any, threading.Lock]:
+        """Load the GGUF model once per process; returns it with the lock that serializes its use"""
+        with self._models_lock:
+            model = self._models.get(self.model_path)
+            if model is None:
+                try:
+                    from llama_cpp import Llama
+                except ImportError:
+                    raise RuntimeError("llama-cpp-python is required for in-process local inference")
+                logger.info("Loading local model: %s", self.model_path)
+                model = Llama(model_path=self.model_path,
+                              n_ctx=int(os.getenv('LOCAL_LLM_CONTEXT', '2048')),
+                              n_threads=int(os.getenv('LOCAL_LLM_THREADS', str(os.cpu_count() or 4))),
+                              verbose=False)
+                self._models[self.model_path] = model
+                self._model_locks[self.model_path] = threading.Lock()
+            return model, self._model_locks[self.model_path]
+
+
+class ProviderRouter:
+    """Routes each operation (mcq, boolean, answer_analysis...) to a provider and model.
+
+    Routes come from ``INFERENCE_ROUTES``, e.g. ``boolean=local,mcq=local``;
+    operations without a route use the default provider. With model tiering, the
+    provider then serves the model of the operation's tier, and request outcomes
+    feed the tier health that triggers downgrades.
+    """
+
+    # Shared by every router in the process so identical concurrent requests coalesce
+    _inflight = SingleFlight()
+
+    def __init__(self, providers: Dict[str, InferenceProvider], default: str,
+                 routes: Optional[Dict[str, str]] = None, tiering: Optional[ModelTiering] = None):
+        if default not in providers:
+            raise RuntimeError(f"Default inference provider '{default}' is not configured")
+        self.providers = providers
+        self.default = default
+        self.tiering = tiering
+        self.routes = {op: name for op, name in (routes or {}).items() if name in providers}
+        for op, name in (routes or {}).items():
+            if name not in providers:
+                logger.warning("Ignoring route %s=%s: provider not configured", op, name)
+        self._variants: Dict[Tuple[str, str], InferenceProvider] = {}
+        self._variants_lock = threading.Lock()
+
+    @staticmethod
+    def parse_routes(spec: str) -> Dict[str, str]:
+        """Parse 'op=provider,op=provider' into a dict"""
+        routes = {}
+        for item in spec.split(','):
+            if '=' in item:
+                op, name = item.split('=', 1)
+                routes[op.strip()] = name.strip()
+        return routes
+
+    def select(self, operation: str) -> Tuple[InferenceProvider, Optional[str]]:
+        """Provider (bound to its tier's model) and tier for an operation"""
+        provider = self.providers[self.routes.get(operation, self.default)]
+        if self.tiering is None:
+            return provider, None
+        tier = self.tiering.tier_for(operation, provider.name)
+        model = self.tiering.model_for(tier, provider.name)
+        if not model:
+            return provider, tier
+        key = (provider.name, model)
+        with self._variants_lock:
+            variant = self._variants.get(key)
+            if variant is None:
+                variant = self._variants[key] = provider.with_model(model)
+        return variant, tier
+
+    def provider_for(self, operation: str) -> InferenceProvider:
+        return self.select(operation)[0]
+
+    def complete(self, operation: str, messages: List[Dict[str, str]], max_tokens: int,
+                 temperature: float) -> Completion:
+        provider, tier = self.select(operation)
+        start = time.perf_counter()
+        try:
+            with span(f"upstream {operation} [{provider.model}]"):
+                text = provider.complete(messages, max_tokens, temperature)
+        except Exception:
+            self._observe(provider, tier, None, False)
+            raise
+        elapsed = time.perf_counter() - start
+        logger.debug("%s completion via %s model=%s tier=%s in %.0fms", operation, provider.name,
+                     provider.model, tier or '-', elapsed * 1000)
+        self._observe(provider, tier, elapsed, True)
+        return Completion(text, provider.model)
+
+    def complete_shared(self, operation: str, messages: List[Dict[str, str]], max_tokens: int,
+                        temperature: float) -> Completion:
+        """complete(), sharing one upstream call among identical concurrent requests in the process"""
+        provider = self.provider_for(operation)
+        key = SingleFlight.make_key(provider.name, provider.model, messages, max_tokens, temperature)
+        completion, shared = self._inflight.do(key, self.complete, operation, messages, max_tokens, temperature)
+        return completion._replace(shared=True) if shared else completion
+
+    @classmethod
+    def coalesced_requests(cls) -> int:
+        """Upstream requests saved in this process by sharing identical in-flight calls"""
+        return cls._inflight.requests_saved
+
+    def stream(self, operation: str, messages: List[Dict[str, str]], max_tokens: int,
+               temperature: float, inter_token_timeout: float = 10.0) -> CompletionStream:
+        provider, tier = self.select(operation)
+        deltas = provider.stream(messages, max_tokens, temperature, inter_token_timeout)
+        return CompletionStream(self._observed_stream(provider, tier, deltas), provider.model)
+
+    def _observed_stream(self, provider: InferenceProvider, tier: Optional[str],
+                         deltas: Iterator[str]) -> Iterator[str]:
+        # Stream durations scale with the question count, so only failures feed tier health
+        try:
+            yield from deltas
+        except Exception:
+            self._observe(provider, tier, None, False)
+            raise
+        self._observe(provider, tier, None, True)
+
+    def _observe(self, provider: InferenceProvider, tier: Optional[str], seconds: Optional[float],
+                 ok: bool) -> None:
+        if self.tiering is not None:
+            self.tiering.observe(provider.name, tier, seconds, ok)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._variants_lock:
+            variants = list(self._variants.values())
+        providers = list(self.providers.values())
+        return [provider.stats() for provider in providers + [v for v in variants if v not in providers]]
+
+    def tier_stats(self) -> Dict[str, Any]:
+        """Observed latency, error rate and downgrade state per provider and tier"""
+        return self.tiering.stats() if self.tiering is not None else {}
+
+
+def build_router(default: str, remote: Optional[InferenceProvider] = None) -> ProviderRouter:
+    """Build a router from the environment around an already configured remote provider.
+
+    ``INFERENCE_PROVIDER`` overrides the default; a local provider is added when
+    ``LOCAL_LLM_URL`` or ``LOCAL_LLM_MODEL_PATH`` is set. Model tiers are opt-in
+    (``MODEL_TIERING_ENABLED=true``) since they replace each provider's configured
+    model for the operations they cover.
+    """
+    providers: Dict[str, InferenceProvider] = {}
+    if remote is not None:
+        providers[remote.name] = remote
+    if os.getenv('LOCAL_LLM_URL') or os.getenv('LOCAL_LLM_MODEL_PATH'):
+        providers[LocalProvider.name] = LocalProvider()
+
+    default = os.getenv('INFERENCE_PROVIDER', default)
+    routes = ProviderRouter.parse_routes(os.getenv('INFERENCE_ROUTES', ''))
+    tiering = None
+    if os.getenv('MODEL_TIERING_ENABLED', 'false').lower() == 'true':
+        tiering = ModelTiering.shared()
+    return ProviderRouter(providers, default, routes, tiering)
@@ -0,0 +1,246 @@
+"""
+Language Pack Registry
+Loads per-language prompts, response parsers and fallback text from lib/language_packs
+"""
+
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+LANGUAGE_PACKS_DIR = Path(os.getenv('LANGUAGE_PACKS_DIR', Path(__file__).parent / 'language_packs'))
+DEFAULT_LANGUAGE = 'en'
+
+
+def _merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """Recursively merge override into a copy of base"""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _prefix_pattern(prefixes: List[str]) -> str:
+    """Regex alternation for label prefixes, tolerant of spacing before the colon"""
+    parts = []
+    for prefix in prefixes:
+        label = prefix.rstrip(':').strip()
+        parts.append(re.escape(label))
+    return '(?:' + '|'.join(dict.fromkeys(parts)) + r')\s*:'
+
+
+class LanguagePack:
+    """Prompt templates, compiled parsers and fallback text for one language"""
+
+    def __init__(self, code: str, data: Dict[str, Any], english: Optional[Dict[str, Any]] = None):
+        self.code = code
+        self.data = data
+        self.name = data.get('name', code)
+        self.mcq = data.get('mcq', {})
+        self.analysis = data.get('analysis', {})
+
+        # Models often answer with English labels, so accept them for every language
+        english_mcq = (english or {}).get('mcq', self.mcq)
+        self.option_letters: Tuple[str, ...] = tuple(self.mcq.get('option_letters', ['A', 'B', 'C', 'D']))
+        self.letter_index: Dict[str, int] = {letter: i for i, letter in enumerate(self.option_letters)}
+        for i, letter in enumerate(english_mcq.get('option_letters', [])):
+            self.letter_index.setdefault(letter, i)
+        letters = '|'.join(re.escape(letter) for letter in self.letter_index)
+
+        self.question_re = re.compile(
+            r'^\s*' + _prefix_pattern([self.mcq.get('question_prefix', 'Question:'),
+                                       english_mcq.get('question_prefix', 'Question:')]) + r'\s*(.*)$',
+            re.IGNORECASE)
+        self.option_re = re.compile(r'^\s*(' + letters + r')\s*[\)\.]\s*(.*)$')
+        self.correct_re = re.compile(
+            r'^\s*' + _prefix_pattern([self.mcq.get('correct_prefix', 'Correct:'),
+                                       english_mcq.get('correct_prefix', 'Correct:')]) + r'\s*\(?(' + letters + r')',
+            re.IGNORECASE)
+
+        self._mcq_prompt_head, self._mcq_prompt_tail = self._build_mcq_template()
+
+    def _build_mcq_template(self) -> Tuple[str, str]:
+        """Pre-render the MCQ prompt around the per-call context"""
+        requirements_text = '\n- '.join([''] + self.mcq.get('requirements', []))
+        head = f"{self.mcq.get('instruction', '')}\n\nContext: "
+        tail = f"\n\nRequirements:{requirements_text}\n\n{self.mcq.get('format', '')}"
+        if self.mcq.get('response_instruction'):
+            tail += f"\n\n{self.mcq['response_instruction']}"
+        return head, tail
+
+    def mcq_prompt(self, context: str, count: int = 1) -> str:
+        """Build the MCQ generation prompt for the given context"""
+        prompt = self._mcq_prompt_head + context + self._mcq_prompt_tail
+        if count > 1 and self.mcq.get('multi_instruction'):
+            prompt += "\n\n" + self.mcq['multi_instruction'].format(count=count)
+        return prompt
+
+    def parse_mcq(self, response: str) -> Tuple[str, List[str], str]:
+        """Parse a model response into (question, options, correct option text)"""
+        question_text = ""
+        options = []
+        correct_answer = ""
+
+        for line in response.strip().split('\n'):
+            match = self.question_re.match(line)
+            if match:
+                question_text = match.group(1).strip()
+                continue
+            match = self.correct_re.match(line)
+            if match:
+                index = self.letter_index[match.group(1)]
+                if len(options) > index:
+                    correct_answer = options[index]
+                continue
+            match = self.option_re.match(line)
+            if match:
+                options.append(match.group(2).strip())
+
+        return question_text, options, correct_answer
+
+    def mcq_stream_parser(self) -> 'MCQStreamParser':
+        """Incremental parser for a streamed response containing several MCQs"""
+        return MCQStreamParser(self)
+
+    def fallback_analysis_text(self, role: str, answered: bool, word_count: int) -> Dict[str, Any]:
+        """Localized fallback feedback used when AI analysis is unavailable"""
+        analysis = self.analysis
+        return {
+            'strengths': list(analysis['fallback_strengths'] if answered else analysis['fallback_strengths_empty']),
+            'weaknesses': list(analysis['fallback_weaknesses_short'] if word_count < 50 else analysis['fallback_weaknesses_long']),
+            'suggestions': [s.format(role=role) for s in analysis['fallback_suggestions']],
+            'expected': analysis['fallback_expected_answer'].format(role=role)
+        }
+
+
+class MCQStreamParser:
+    """Parses MCQs out of streamed text, returning each one as soon as it is complete.
+
+    A question is complete when its ``Correct:`` line arrives, or when the next
+    question starts or the stream ends.
+    """
+
+    def __init__(self, pack: LanguagePack):
+        self.pack = pack
+        self._pending = ''
+        self._question = None
+        self._options: List[str] = []
+
+    def feed(self, text: str) -> List[Tuple[str, List[str], str]]:
+        """Add streamed text; return the (question, options, correct) tuples it completed"""
+        self._pending += text
+        *lines, self._pending = self._pending.split('\n')
+        finished = []
+        for line in lines:
+            self._parse_line(line, finished)
+        return finished
+
+    def close(self) -> List[Tuple[str, List[str], str]]:
+        """Flush the last partial line and any unfinished question"""
+        finished = []
+        if self._pending:
+            self._parse_line(self._pending, finished)
+            self._pending = ''
+        self._finish('', finished)
+        return finished
+
+    def _finish(self, correct_answer: str, finished: List[Tuple[str, List[str], str]]) -> None:
+        if self._question is not None:
+            finished.append((self._question, self._options, correct_answer))
+        self._question = None
+        self._options = []
+
+    def _parse_line(self, line: str, finished: List[Tuple[str, List[str], str]]) -> None:
+        pack = self.pack
+        match = pack.question_re.match(line)
+        if match:
+            self._finish('', finished)
+            self._question = match.group(1).strip()
+            return
+        match = pack.correct_re.match(line)
+        if match:
+            index = pack.letter_index[match.group(1)]
+            self._finish(self._options[index] if len(self._options) > index else '', finished)
+            return
+        match = pack.option_re.match(line)
+        if match and self._question is not None:
+            self._options.append(match.group(2).strip())
+
+
+class LanguagePackRegistry:
+    """Lazily loads and caches language packs; unknown languages resolve to English"""
+
+    def __init__(self, packs_dir: Path = LANGUAGE_PACKS_DIR):
+        self.packs_dir = Path(packs_dir)
+        self._packs: Dict[str, LanguagePack] = {}
+        self._lock = threading.Lock()
+
+    def _load_raw(self, code: str, seen: Tuple[str, ...] = ()) -> Optional[Dict[str, Any]]:
+        """Read a pack file, resolving its "extends" chain"""
+        path = self.packs_dir / f"{code}.json"
+        if not path.is_file() or code in seen:
+            return None
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        parent = data.pop('extends', DEFAULT_LANGUAGE if code != DEFAULT_LANGUAGE else None)
+        if parent:
+            base = self._load_raw(parent, seen + (code,))
+            if base:
+                base.pop('name', None)
+                data = _merge(base, data)
+        return data
+
+    def get(self, code: str) -> LanguagePack:
+        """Return the pack for a language code such as 'hi' or 'ta'"""
+        code = (code or DEFAULT_LANGUAGE).lower()
+        pack = self._packs.get(code)
+        if pack is not None:
+            return pack
+
+        with self._lock:
+            pack = self._packs.get(code)
+            if pack is None:
+                data = self._load_raw(code) if re.fullmatch(r'[a-z]{2,3}(-[a-z0-9]+)?', code) else None
+                if data is None:
+                    pack = self.get_default() if code != DEFAULT_LANGUAGE else None
+                    if pack is None:
+                        raise RuntimeError(f"Default language pack not found in {self.packs_dir}")
+                else:
+                    english = self._load_raw(DEFAULT_LANGUAGE) if code != DEFAULT_LANGUAGE else data
+                    pack = LanguagePack(code, data, english)
+                self._packs[code] = pack
+        return pack
+
+    def get_default(self) -> Optional[LanguagePack]:
+        """Return the English pack, loading it if needed"""
+        pack = self._packs.get(DEFAULT_LANGUAGE)
+        if pack is None:
+            data = self._load_raw(DEFAULT_LANGUAGE)
+            if data is None:
+                return None
+            pack = LanguagePack(DEFAULT_LANGUAGE, data, data)
+            self._packs[DEFAULT_LANGUAGE] = pack
+        return pack
+
+    def available(self) -> List[str]:
+        """Language codes that have a pack file"""
+        return sorted(path.stem for path in self.packs_dir.glob('*.json'))
+
+
+_registry = LanguagePackRegistry()
+
+
+def get_language_pack(code: str) -> LanguagePack:
+    """Return the shared language pack for a language code"""
+    return _registry.get(code)
+
+
+def language_name(code: str) -> str:
+    """Human-readable language name, falling back to the code itself"""
+    pack = _registry.get(code)
+    return pack.name if pack.code == (code or DEFAULT_LANGUAGE).lower() else code
@@ -0,0 +1,200 @@
+"""
+Model Tiers
+Declarative per-operation model selection with automatic downgrade on slow or failing tiers
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from structured_logging import get_logger
+
+DEFAULT_TIERS_PATH = Path(__file__).parent / 'model_tiers.json'
+
+logger = get_logger('model_tiers')
+
+DEFAULT_HEALTH = {
+    'window': 50,
+    'min_samples': 10,
+    'p95_latency_ms': 12000,
+    'error_rate': 0.25,
+    'cooldown_seconds': 120
+}
+
+
+class TierHealth:
+    """Rolling latency and error window for one tier on one provider.
+
+    When the window's p95 latency or error rate passes its threshold the tier is
+    marked degraded for ``cooldown_seconds``; the window is cleared so the tier is
+    judged on fresh samples once traffic returns to it.
+    """
+
+    def __init__(self, window: int, min_samples: int, p95_latency_ms: float, error_rate: float,
+                 cooldown_seconds: float):
+        self.min_samples = min_samples
+        self.p95_latency_ms = p95_latency_ms
+        self.max_error_rate = error_rate
+        self.cooldown_seconds = cooldown_seconds
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.degraded_until = 0.0
+        self.degraded_reason = None
+        self.downgrades = 0
+
+    def observe(self, seconds: Optional[float], ok: bool) -> Optional[str]:
+        """Record one request; returns the reason if this observation degraded the tier"""
+        with self._lock:
+            if seconds is not None and ok:
+                self._latencies.append(seconds * 1000)
+            self._outcomes.append(ok)
+            if len(self._outcomes) < self.min_samples:
+                return None
+
+            reason = None
+            p95 = self._p95()
+            error_rate = self._error_rate()
+            if p95 is not None and p95 > self.p95_latency_ms:
+                reason = f"p95 latency {p95:.0f}ms > {self.p95_latency_ms:.0f}ms"
+            elif error_rate > self.max_error_rate:
+                reason = f"error rate {error_rate:.0%} > {self.max_error_rate:.0%}"
+            if reason:
+                self.degraded_until = time.monotonic() + self.cooldown_seconds
+                self.degraded_reason = reason
+                self.downgrades += 1
+                self._latencies.clear()
+                self._outcomes.clear()
+            return reason
+
+    def _p95(self) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+    def _error_rate(self) -> float:
+        return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+    @property
+    def degraded(self) -> bool:
+        return time.monotonic() < self.degraded_until
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            p95 = self._p95()
+            return {
+                'samples': len(self._outcomes),
+                'p95_latency_ms': round(p95, 1) if p95 is not None else None,
+                'error_rate': round(self._error_rate(), 4),
+                'degraded': self.degraded,
+                'degraded_reason': self.degraded_reason if self.degraded else None,
+                'downgrades': self.downgrades
+            }
+
+
+class ModelTiering:
+    """Maps operations to model tiers and tiers to a model per provider.
+
+    Config (``model_tiers.json`` or ``MODEL_TIERS_PATH``)::
+
+        {"tiers": {"small": {"models": {"openrouter": "..."}},
+                   "large": {"models": {...}, "downgrade_to": "small"}},
+         "operations": {"boolean": "small", "answer_analysis": "large"},
+         "default_tier": "small",
+         "health": {"p95_latency_ms": 12000, "error_rate": 0.25, ...}}
+
+    A tier without a model for a provider uses that provider's configured model.
+    While a tier is degraded its operations follow ``downgrade_to``.
+
+    Tier health lives in the process, so downgrades need a long-running process
+    (the analysis job workers, a replay run) to collect ``min_samples``; a CLI
+    process that serves one request starts from a fresh window every time.
+    """
+
+    _shared: Dict[str, Optional['ModelTiering']] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, config: Dict[str, Any]):
+        self.tiers: Dict[str, Dict[str, Any]] = config.get('tiers', {})
+        self.operations: Dict[str, str] = config.get('operations', {})
+        self.default_tier: Optional[str] = config.get('default_tier')
+        self.health_config = dict(DEFAULT_HEALTH, **config.get('health', {}))
+        self._health: Dict[str, TierHealth] = {}
+        self._health_lock = threading.Lock()
+
+        for operation, tier in list(self.operations.items()):
+            if tier not in self.tiers:
+                logger.warning("Ignoring model tier %s=%s: tier not defined", operation, tier)
+                del self.operations[operation]
+        if self.default_tier not in self.tiers:
+            self.default_tier = None
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> Optional['ModelTiering']:
+        """Load the tier config; None if it is missing or unreadable"""
+        path = Path(path or os.getenv('MODEL_TIERS_PATH', DEFAULT_TIERS_PATH))
+        try:
+            with open(path, encoding='utf-8') as f:
+                return cls(json.load(f))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Ignoring unreadable model tiers %s: %s", path, e)
+            return None
+
+    @classmethod
+    def shared(cls, path: Optional[str] = None) -> Optional['ModelTiering']:
+        """Process-wide instance per config file, so tier health survives across generators"""
+        key = str(path or os.getenv('MODEL_TIERS_PATH', DEFAULT_TIERS_PATH))
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls.load(key)
+            return cls._shared[key]
+
+    def _tier_health(self, provider: str, tier: str) -> TierHealth:
+        key = f"{provider}:{tier}"
+        with self._health_lock:
+            health = self._health.get(key)
+            if health is None:
+                health = self._health[key] = TierHealth(**self.health_config)
+            return health
+
+    def tier_for(self, operation: str, provider: str) -> Optional[str]:
+        """Configured tier for an operation, following downgrades of degraded tiers"""
+        tier = self.operations.get(operation, self.default_tier)
+        seen = set()
+        while tier and tier not in seen and self._tier_health(provider, tier).degraded:
+            seen.add(tier)
+            fallback = self.tiers[tier].get('downgrade_to')
+            if fallback not in self.tiers:
+                break
+            tier = fallback
+        return tier
+
+    def model_for(self, tier: Optional[str], provider: str) -> Optional[str]:
+        """Model of a tier on a provider, or None to use the provider's own model"""
+        if not tier:
+            return None
+        return self.tiers[tier].get('models', {}).get(provider)
+
+    def observe(self, provider: str, tier: Optional[str], seconds: Optional[float], ok: bool) -> None:
+        """Record a request outcome; streams pass seconds=None so only errors count"""
+        if not tier:
+            return
+        reason = self._tier_health(provider, tier).observe(seconds, ok)
+        if reason:
+            fallback = self.tiers[tier].get('downgrade_to')
+            action = f"downgrading to '{fallback}'" if fallback in self.tiers else "no lower tier to use"
+            logger.warning("Model tier '%s' on %s degraded (%s); %s for %ss",
+                           tier, provider, reason, action, self.health_config['cooldown_seconds'])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._health_lock:
+            health = dict(self._health)
+        return {key: tier_health.stats() for key, tier_health in health.items()}
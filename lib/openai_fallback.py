@@ -9,8 +9,16 @@ import json
 import os
 import openai
 
+from structured_logging import get_logger, request_context
+
+logger = get_logger('openai_fallback')
+
 def generate_questions_openai(data):
     """Generate questions using OpenAI API as fallback"""
+    with request_context(data.get('requestId')):
+        return _generate_questions_openai(data)
+
+def _generate_questions_openai(data):
     try:
         role = data.get('role', 'Software Engineer')
         experience = data.get('experience', '2-3 years')
@@ -67,7 +75,7 @@ Generate exactly {count} questions and return only the JSON array, no other text
             raise Exception("Failed to parse OpenAI response")
             
     except Exception as e:
-        print(f"OpenAI API error: {e}", file=sys.stderr)
+        logger.warning("OpenAI API error: %s", e)
         return {"success": False, "error": str(e)}
 
 if __name__ == "__main__":
@@ -14,80 +14,117 @@ Uses Gemma 3n 4B model via OpenRouter API for AI I                fallback_quest
 """
 
 import json
-import sys
 import os
+import re
+import math
 import random
-import requests
-from typing import List, Dict, Any
+import threading
+import time
+import contextvars
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional
+
+from inference_providers import Completion, CompletionStream, OpenRouterProvider, build_router
+from language_registry import get_language_pack
+from structured_logging import get_logger
+
+logger = get_logger('questgen')
+
+
+def _token_similarity(a: str, b: str) -> float:
+    """Cosine similarity between the word counts of two texts (0.0 - 1.0)"""
+    a_counts = Counter(re.findall(r'\w+', a.lower()))
+    b_counts = Counter(re.findall(r'\w+', b.lower()))
+    if not a_counts or not b_counts:
+        return 0.0
+    dot = sum(count * b_counts[word] for word, count in a_counts.items())
+    norm = math.sqrt(sum(c * c for c in a_counts.values())) * math.sqrt(sum(c * c for c in b_counts.values()))
+    return dot / norm if norm else 0.0
+
+
+class FollowUpSpeculation:
+    """Handle for follow-up questions being generated from a partial answer"""
+
+    def __init__(self, partial_answer: str, conversation: List[Dict[str, Any]]):
+        self.partial_answer = partial_answer
+        self.conversation = conversation
+        self.futures = []
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """Cancel pending speculative calls; in-flight results are discarded"""
+        self.cancelled = True
+        for future in self.futures:
+            future.cancel()
+
+    def candidates(self) -> List[Completion]:
+        """Return the candidate questions that finished successfully"""
+        results = []
+        for future in self.futures:
+            if future.cancelled() or not future.done() or future.exception() is not None:
+                continue
+            if future.result() and future.result().text:
+                results.append(future.result())
+        return results
+
 
 class OpenRouterQuestionGenerator:
     def __init__(self):
         """Initialize the OpenRouter AI Question Generator"""
-        print("Initializing OpenRouter AI Question Generator...", file=sys.stderr)
+        logger.debug("Initializing OpenRouter AI Question Generator...")
         
-        # Get API key from environment variable
+        # Get API key from environment variable (optional when everything runs locally)
         self.api_key = os.getenv('OPENROUTER_API_KEY')
-        if not self.api_key:
-            print("❌ OpenRouter API key not found in environment!", file=sys.stderr)
-            print("Please check your .env.local file", file=sys.stderr)
+        if not self.api_key and os.getenv('INFERENCE_PROVIDER', 'openrouter') == 'openrouter':
+            logger.error("OpenRouter API key not found in environment! Please check your .env.local file")
             raise RuntimeError("OpenRouter API key not configured")
             
         self.base_url = os.getenv('OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1')
         self.model = os.getenv('OPENROUTER_MODEL', 'qwen/qwen-2-7b-instruct:free')
         
-        print(f"Using model: {self.model}", file=sys.stderr)
-        print("OpenRouter AI Question Generator initialized successfully!", file=sys.stderr)
-
-    def _make_api_request(self, messages: List[Dict[str, str]], max_tokens: int = 200) -> str:
-        """Make a request to OpenRouter API"""
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://localhost:3000",  # Required by OpenRouter
-            "X-Title": "AI Interview Coach"  # Optional but recommended
-        }
+        remote = OpenRouterProvider(self.api_key, self.model, self.base_url) if self.api_key else None
+        self.router = build_router(OpenRouterProvider.name, remote)
+        self.stream_token_timeout = float(os.getenv('OPENROUTER_STREAM_TOKEN_TIMEOUT', '10'))
         
-        data = {
-            "model": self.model,
-            "messages": messages,
-            "max_tokens": max_tokens,
-            "temperature": 0.8
-        }
+        # Speculative follow-up generation: upstream calls allowed per window, refilled continuously
+        self.speculation_budget = int(os.getenv('OPENROUTER_SPECULATION_BUDGET', '6'))
+        self.speculation_window = float(os.getenv('OPENROUTER_SPECULATION_WINDOW', '60'))
+        self.speculative_calls = 0
+        self._speculation_tokens = float(self.speculation_budget)
+        self._speculation_refilled = time.monotonic()
+        self._speculation_lock = threading.Lock()
+        self._speculation_executor = None
         
-        try:
-            # Use the correct OpenRouter endpoint
-            url = "https://openrouter.ai/api/v1/chat/completions"
-            print(f"Making request to: {url}", file=sys.stderr)
-            print(f"Using model: {self.model}", file=sys.stderr)
-            print("API Key: [REDACTED]", file=sys.stderr)
-            
-            response = requests.post(url, 
-                                   headers=headers, 
-                                   json=data, 
-                                   timeout=30)
-            
-            print(f"Response status: {response.status_code}", file=sys.stderr)
-            if not response.ok:
-                print(f"Response headers: {dict(response.headers)}", file=sys.stderr)
-                print(f"Response text: {response.text}", file=sys.stderr)
-            
-            response.raise_for_status()
-            
-            result = response.json()
-            if 'choices' in result and len(result['choices']) > 0:
-                return result['choices'][0]['message']['content']
-            else:
-                print(f"Unexpected response format: {result}", file=sys.stderr)
-                raise RuntimeError("Invalid response format from API")
-                
-        except requests.exceptions.RequestException as e:
-            print(f"Request error: {e}", file=sys.stderr)
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"Error response: {e.response.text}", file=sys.stderr)
-            raise RuntimeError(f"API request failed: {e}")
-        except Exception as e:
-            print(f"General error: {e}", file=sys.stderr)
-            raise RuntimeError(f"Failed to generate content: {e}")
+        # Upstream requests this generator saved by sharing identical in-flight calls
+        self.coalesced_requests = 0
+        self._coalesced_lock = threading.Lock()
+        
+        logger.debug("OpenRouter AI Question Generator initialized with default model %s", self.model)
+
+    def inference_stats(self) -> List[Dict[str, Any]]:
+        """Per-provider and per-model request counts and tokens/sec, for sizing inference nodes"""
+        return self.router.stats()
+
+    def tier_stats(self) -> Dict[str, Any]:
+        """Observed latency and error rate of each model tier, and whether it is downgraded"""
+        return self.router.tier_stats()
+
+    def _make_api_request(self, messages: List[Dict[str, str]], max_tokens: int = 200, unique: bool = False,
+                          operation: str = 'default') -> Completion:
+        """Make a request to the provider routed for this operation, sharing identical concurrent requests unless unique"""
+        if unique:
+            return self._post_completion(messages, max_tokens, operation)
+        completion = self.router.complete_shared(operation, messages, max_tokens, temperature=0.8)
+        if completion.shared:
+            with self._coalesced_lock:
+                self.coalesced_requests += 1
+        return completion
+
+    def _post_completion(self, messages: List[Dict[str, str]], max_tokens: int,
+                         operation: str = 'default') -> Completion:
+        """Send a chat completion request through the provider router and model tier for the operation"""
+        return self.router.complete(operation, messages, max_tokens, temperature=0.8)
 
     def generate_technical_questions(self, context: str, role: str, difficulty: str, count: int = 3) -> List[Dict[str, Any]]:
         """Generate technical interview questions using OpenRouter API"""
@@ -108,210 +145,190 @@ Requirements:
 - Return only the question text, no additional formatting"""
 
                 messages = [{"role": "user", "content": prompt}]
-                question_text = self._make_api_request(messages, max_tokens=150)
+                completion = self._make_api_request(messages, max_tokens=150, operation='technical')
                 
-                # Clean the response
-                question_text = question_text.strip()
-                if not question_text.endswith('?'):
-                    question_text += '?'
-                
-                questions.append({
-                    "id": f"openrouter_tech_{i}_{random.randint(1000, 9999)}",
-                    "text": question_text,  # Use "text" field instead of "question"
-                    "category": "Technical",
-                    "type": "technical",
-                    "difficulty": difficulty,
-                    "role": role,
-                    "source": "openrouter_ai",
-                    "model_used": self.model,
-                    "confidence": 0.95
-                })
+                questions.append(self._build_technical_question(i, completion.text, role, difficulty,
+                                                                completion.model))
                 
             except Exception as e:
-                print(f"Error generating technical question {i}: {e}", file=sys.stderr)
-                # Fallback question
-                fallback_question = f"How would you approach solving a complex {role.lower()} challenge in a production environment?"
-                questions.append({
-                    "id": f"fallback_tech_{i}_{random.randint(1000, 9999)}",
-                    "question": fallback_question,
-                    "type": "technical",
-                    "difficulty": difficulty,
-                    "role": role,
-                    "source": "fallback",
-                    "confidence": 0.7
-                })
+                logger.warning("Error generating technical question %d, using fallback: %s", i, e)
+                questions.append(self._fallback_technical_question(i, role, difficulty))
         
         return questions
 
-    def generate_mcq_questions(self, context: str, count: int = 3, language: str = 'en') -> List[Dict[str, Any]]:
-        """Generate Multiple Choice Questions using OpenRouter API with language support"""
+    def _build_technical_question(self, i: int, question_text: str, role: str, difficulty: str,
+                                  model: str) -> Dict[str, Any]:
+        """Build a technical question result from generated text"""
+        # Clean the response
+        question_text = question_text.strip()
+        if not question_text.endswith('?'):
+            question_text += '?'
         
-        # Language-specific prompt templates
-        prompts = {
-            'en': {
-                'instruction': "Create a multiple choice question for a software engineering interview.",
-                'requirements': [
-                    "Generate a technical question with 4 options",
-                    "Make it relevant to software development", 
-                    "Include clear, distinct options",
-                    "Make sure one option is clearly correct"
-                ],
-                'format': "Format your response as:\nQuestion: [Your question here]\nA) [Option 1]\nB) [Option 2]\nC) [Option 3]\nD) [Option 4]\nCorrect: [Letter of correct answer]"
-            },
-            'hi': {
-                'instruction': "सॉफ्टवेयर इंजीनियरिंग साक्षात्कार के लिए एक बहुविकल्पीय प्रश्न बनाएं।",
-                'requirements': [
-                    "4 विकल्पों के साथ एक तकनीकी प्रश्न बनाएं",
-                    "इसे सॉफ्टवेयर विकास के लिए प्रासंगिक बनाएं",
-                    "स्पष्ट, अलग विकल्प शामिल करें", 
-                    "सुनिश्चित करें कि एक विकल्प स्पष्ट रूप से सही है"
-                ],
-                'format': "अपने उत्तर को इस प्रारूप में दें:\nप्रश्न: [आपका प्रश्न यहाँ]\nक) [विकल्प 1]\nख) [विकल्प 2]\nग) [विकल्प 3]\nघ) [विकल्प 4]\nसही: [सही उत्तर का अक्षर]"
-            },
-            'es': {
-                'instruction': "Crea una pregunta de opción múltiple para una entrevista de ingeniería de software.",
-                'requirements': [
-                    "Genera una pregunta técnica con 4 opciones",
-                    "Hazla relevante para el desarrollo de software",
-                    "Incluye opciones claras y distintas",
-                    "Asegúrate de que una opción sea claramente correcta"
-                ],
-                'format': "Formatea tu respuesta como:\nPregunta: [Tu pregunta aquí]\nA) [Opción 1]\nB) [Opción 2]\nC) [Opción 3]\nD) [Opción 4]\nCorrecta: [Letra de la respuesta correcta]"
-            }
+        return {
+            "id": f"openrouter_tech_{i}_{random.randint(1000, 9999)}",
+            "text": question_text,  # Use "text" field instead of "question"
+            "category": "Technical",
+            "type": "technical",
+            "difficulty": difficulty,
+            "role": role,
+            "source": "openrouter_ai",
+            "model_used": model,
+            "confidence": 0.95
+        }
+
+    def _fallback_technical_question(self, i: int, role: str, difficulty: str) -> Dict[str, Any]:
+        """Fallback technical question used when generation fails"""
+        fallback_question = f"How would you approach solving a complex {role.lower()} challenge in a production environment?"
+        return {
+            "id": f"fallback_tech_{i}_{random.randint(1000, 9999)}",
+            "question": fallback_question,
+            "type": "technical",
+            "difficulty": difficulty,
+            "role": role,
+            "source": "fallback",
+            "confidence": 0.7
         }
+
+    def generate_mcq_questions(self, context: str, count: int = 3, language: str = 'en') -> List[Dict[str, Any]]:
+        """Generate Multiple Choice Questions using OpenRouter API with language support"""
         
-        # Use English as fallback if language not supported
-        prompt_template = prompts.get(language, prompts['en'])
+        # Prompts, parsers and fallbacks come precompiled from the language pack
+        pack = get_language_pack(language)
+        prompt = pack.mcq_prompt(context)
         
         mcq_questions = []
         
         for i in range(count):
             try:
-                # Build language-specific prompt
-                requirements_text = '\n- '.join([''] + prompt_template['requirements'])
-                
-                prompt = f"""{prompt_template['instruction']}
-
-Context: {context}
-
-Requirements:{requirements_text}
-
-{prompt_template['format']}"""
-
                 messages = [{"role": "user", "content": prompt}]
-                response = self._make_api_request(messages, max_tokens=200)
+                completion = self._make_api_request(messages, max_tokens=200, operation='mcq')
                 
                 # Parse the response to extract question and options (language-aware)
-                lines = response.strip().split('\n')
-                question_text = ""
-                options = []
-                correct_answer = ""
-                
-                # Language-specific parsing patterns
-                question_prefixes = {
-                    'en': 'Question:',
-                    'hi': 'प्रश्न:',
-                    'es': 'Pregunta:'
-                }
-                
-                option_patterns = {
-                    'en': ('A)', 'B)', 'C)', 'D)'),
-                    'hi': ('क)', 'ख)', 'ग)', 'घ)'),
-                    'es': ('A)', 'B)', 'C)', 'D)')
-                }
-                
-                correct_prefixes = {
-                    'en': 'Correct:',
-                    'hi': 'सही:',
-                    'es': 'Correcta:'
-                }
-                
-                question_prefix = question_prefixes.get(language, 'Question:')
-                patterns = option_patterns.get(language, ('A)', 'B)', 'C)', 'D)'))
-                correct_prefix = correct_prefixes.get(language, 'Correct:')
-                
-                for line in lines:
-                    line = line.strip()
-                    if line.startswith(question_prefix):
-                        question_text = line.replace(question_prefix, '').strip()
-                    elif line.startswith(patterns):
-                        option_text = line[3:].strip()  # Remove option prefix like "A) "
-                        options.append(option_text)
-                    elif line.startswith(correct_prefix):
-                        correct_letter = line.replace(correct_prefix, '').strip()
-                        
-                        # Handle different language patterns for correct answers
-                        if language == 'hi':
-                            # Map Hindi letters to English for indexing
-                            hindi_to_index = {'क': 0, 'ख': 1, 'ग': 2, 'घ': 3}
-                            if correct_letter in hindi_to_index and len(options) > hindi_to_index[correct_letter]:
-                                correct_answer = options[hindi_to_index[correct_letter]]
-                        else:
-                            # English and Spanish use A, B, C, D
-                            if correct_letter in ['A', 'B', 'C', 'D'] and len(options) > ord(correct_letter) - ord('A'):
-                                correct_answer = options[ord(correct_letter) - ord('A')]
-                
-                # Language-specific fallbacks if parsing fails
-                if not question_text:
-                    fallback_questions = {
-                        'en': "What is a key principle of software engineering?",
-                        'hi': "सॉफ्टवेयर इंजीनियरिंग का मुख्य सिद्धांत क्या है?",
-                        'es': "¿Cuál es un principio clave de la ingeniería de software?"
-                    }
-                    question_text = fallback_questions.get(language, fallback_questions['en'])
-                    
-                if len(options) < 4:
-                    fallback_options = {
-                        'en': [
-                            "Code reusability and modularity",
-                            "Writing code as fast as possible", 
-                            "Using only the latest technologies",
-                            "Avoiding documentation"
-                        ],
-                        'hi': [
-                            "कोड पुन: उपयोग और मॉड्यूलरिटी",
-                            "जितनी जल्दी हो सके कोड लिखना",
-                            "केवल नवीनतम तकनीकों का उपयोग करना",
-                            "दस्तावेजीकरण से बचना"
-                        ],
-                        'es': [
-                            "Reutilización de código y modularidad",
-                            "Escribir código lo más rápido posible",
-                            "Usar solo las tecnologías más recientes", 
-                            "Evitar la documentación"
-                        ]
-                    }
-                    options = fallback_options.get(language, fallback_options['en'])
-                    
-                if not correct_answer:
-                    correct_answer = options[0]
-                
-                mcq_questions.append({
-                    "id": f"openrouter_mcq_{i}_{random.randint(1000, 9999)}",
-                    "text": question_text,  # Use "text" field
-                    "category": "Multiple Choice",
-                    "options": options,
-                    "correct_answer": correct_answer,
-                    "type": "mcq",
-                    "source": "openrouter_ai",
-                    "model_used": self.model
-                })
+                question_text, options, correct_answer = pack.parse_mcq(completion.text)
+                mcq_questions.append(self._build_mcq_question(i, pack, question_text, options, correct_answer,
+                                                              completion.model))
                 
             except Exception as e:
-                print(f"Error generating MCQ {i}: {e}", file=sys.stderr)
-                # Fallback MCQ
-                mcq_questions.append({
-                    "id": f"fallback_mcq_{i}_{random.randint(1000, 9999)}",
-                    "text": "What is a key principle of good software design?",  # Use "text" field
-                    "category": "Multiple Choice",
-                    "options": ["Single Responsibility Principle", "Multiple Inheritance", "Global Variables", "Tight Coupling"],
-                    "correct_answer": "Single Responsibility Principle",
-                    "type": "mcq",
-                    "source": "fallback"
-                })
+                logger.warning("Error generating MCQ %d, using fallback: %s", i, e)
+                mcq_questions.append(self._fallback_mcq_question(i))
         
         return mcq_questions
 
+    def _build_mcq_question(self, i: int, pack, question_text: str, options: List[str],
+                            correct_answer: str, model: str) -> Dict[str, Any]:
+        """Build an MCQ result, filling unparsed parts from the language pack"""
+        # Language-specific fallbacks if parsing fails
+        if not question_text:
+            question_text = pack.mcq['fallback_question']
+            
+        if len(options) < 4:
+            options = list(pack.mcq['fallback_options'])
+            correct_answer = ""
+            
+        if not correct_answer:
+            correct_answer = options[0]
+        
+        return {
+            "id": f"openrouter_mcq_{i}_{random.randint(1000, 9999)}",
+            "text": question_text,  # Use "text" field
+            "category": "Multiple Choice",
+            "options": options,
+            "correct_answer": correct_answer,
+            "type": "mcq",
+            "source": "openrouter_ai",
+            "model_used": model
+        }
+
+    def _fallback_mcq_question(self, i: int) -> Dict[str, Any]:
+        """Fallback MCQ used when generation fails"""
+        return {
+            "id": f"fallback_mcq_{i}_{random.randint(1000, 9999)}",
+            "text": "What is a key principle of good software design?",  # Use "text" field
+            "category": "Multiple Choice",
+            "options": ["Single Responsibility Principle", "Multiple Inheritance", "Global Variables", "Tight Coupling"],
+            "correct_answer": "Single Responsibility Principle",
+            "type": "mcq",
+            "source": "fallback"
+        }
+
+    def _stream_api_request(self, messages: List[Dict[str, str]], max_tokens: int,
+                            operation: str = 'default') -> CompletionStream:
+        """Stream completion text deltas; a stream without tokens for the timeout raises StreamStalledError"""
+        return self.router.stream(operation, messages, max_tokens, temperature=0.8,
+                                  inter_token_timeout=self.stream_token_timeout)
+
+    def stream_mcq_questions(self, context: str, count: int = 3, language: str = 'en') -> Iterator[Dict[str, Any]]:
+        """Generate MCQs in one streamed completion, yielding each question as soon as it is complete.
+        
+        If the stream fails or stalls, the questions still missing are yielded as fallbacks.
+        """
+        pack = get_language_pack(language)
+        parser = pack.mcq_stream_parser()
+        messages = [{"role": "user", "content": pack.mcq_prompt(context, count)}]
+        emitted = 0
+        
+        try:
+            with self._stream_api_request(messages, max_tokens=200 * count, operation='mcq') as stream:
+                for delta in stream:
+                    for question_text, options, correct_answer in parser.feed(delta):
+                        if emitted < count:
+                            yield self._build_mcq_question(emitted, pack, question_text, options, correct_answer,
+                                                           stream.model)
+                            emitted += 1
+                    if emitted >= count:
+                        break
+                for question_text, options, correct_answer in parser.close():
+                    if emitted < count:
+                        yield self._build_mcq_question(emitted, pack, question_text, options, correct_answer,
+                                                       stream.model)
+                        emitted += 1
+        except Exception as e:
+            logger.warning("Error streaming MCQs after %d/%d: %s", emitted, count, e)
+        
+        for i in range(emitted, count):
+            yield self._fallback_mcq_question(i)
+
+    def stream_technical_questions(self, context: str, role: str, difficulty: str,
+                                   count: int = 3) -> Iterator[Dict[str, Any]]:
+        """Generate technical questions in one streamed completion, yielding each finished line"""
+        prompt = f"""Generate {count} different technical interview questions for a {role} position with {difficulty} experience level.
+
+Context: {context}
+
+Requirements:
+- Create practical, scenario-based questions
+- Make them relevant to {role} role
+- Appropriate for {difficulty} experience level
+- Focus on real-world application
+- Return one question per line, numbered 1., 2., ... with no additional formatting"""
+
+        messages = [{"role": "user", "content": prompt}]
+        pending = ""
+        emitted = 0
+        
+        try:
+            with self._stream_api_request(messages, max_tokens=150 * count, operation='technical') as stream:
+                for delta in stream:
+                    pending += delta
+                    *lines, pending = pending.split('\n')
+                    for line in lines:
+                        question_text = re.sub(r'^\s*(?:\d+[\.\)]|[-*])\s*', '', line).strip()
+                        if question_text and emitted < count:
+                            yield self._build_technical_question(emitted, question_text, role, difficulty,
+                                                                 stream.model)
+                            emitted += 1
+                    if emitted >= count:
+                        break
+                question_text = re.sub(r'^\s*(?:\d+[\.\)]|[-*])\s*', '', pending).strip()
+                if question_text and emitted < count:
+                    yield self._build_technical_question(emitted, question_text, role, difficulty, stream.model)
+                    emitted += 1
+        except Exception as e:
+            logger.warning("Error streaming technical questions after %d/%d: %s", emitted, count, e)
+        
+        for i in range(emitted, count):
+            yield self._fallback_technical_question(i, role, difficulty)
+
     def generate_boolean_questions(self, context: str, count: int = 3) -> List[Dict[str, Any]]:
         """Generate True/False questions using OpenRouter API"""
         
@@ -334,10 +351,10 @@ Statement: [Your statement here]
 Answer: True/False"""
 
                 messages = [{"role": "user", "content": prompt}]
-                response = self._make_api_request(messages, max_tokens=150)
+                completion = self._make_api_request(messages, max_tokens=150, operation='boolean')
                 
                 # Parse response
-                lines = response.strip().split('\n')
+                lines = completion.text.strip().split('\n')
                 statement = ""
                 answer = ""
                 
@@ -367,11 +384,11 @@ Answer: True/False"""
                     "answer": answer.title(),
                     "type": "boolean",
                     "source": "openrouter_ai",
-                    "model_used": self.model
+                    "model_used": completion.model
                 })
                 
             except Exception as e:
-                print(f"Error generating boolean question {i}: {e}", file=sys.stderr)
+                logger.warning("Error generating boolean question %d, using fallback: %s", i, e)
                 # Fallback boolean question
                 boolean_questions.append({
                     "id": f"fallback_bool_{i}_{random.randint(1000, 9999)}",
@@ -383,3 +400,138 @@ Answer: True/False"""
                 })
         
         return boolean_questions
+
+
+    def _generate_followup_text(self, conversation: List[Dict[str, Any]], answer_text: str,
+                                unique: bool = False) -> Completion:
+        """Generate a single follow-up question for the latest answer"""
+        history = []
+        for turn in conversation[-4:-1]:
+            history.append(f"Q: {turn.get('questionText', '')}")
+            history.append(f"A: {turn.get('answerText', '')}")
+        current_question = conversation[-1].get('questionText', '') if conversation else ''
+        history_text = "\n".join(history) if history else "(first question)"
+        
+        prompt = f"""You are conducting a live technical interview.
+
+Earlier conversation:
+{history_text}
+
+Current question: {current_question}
+Candidate's answer: {answer_text}
+
+Ask one natural follow-up question that digs deeper into the candidate's answer.
+Return only the question text, no additional formatting"""
+
+        messages = [{"role": "user", "content": prompt}]
+        completion = self._make_api_request(messages, max_tokens=120, unique=unique, operation='followup')
+        question_text = completion.text.strip()
+        if question_text and not question_text.endswith('?'):
+            question_text += '?'
+        return Completion(question_text, completion.model)
+
+    def _take_speculation_budget(self, count: int) -> int:
+        """Reserve up to count speculative calls from the token bucket; call with the lock held"""
+        now = time.monotonic()
+        refill = (now - self._speculation_refilled) * self.speculation_budget / max(self.speculation_window, 1e-9)
+        self._speculation_tokens = min(float(self.speculation_budget), self._speculation_tokens + refill)
+        self._speculation_refilled = now
+        allowed = max(0, min(count, int(self._speculation_tokens)))
+        self._speculation_tokens -= allowed
+        self.speculative_calls += allowed
+        return allowed
+
+    def _refund_speculation(self) -> None:
+        """Return a reserved call that never reached the provider"""
+        with self._speculation_lock:
+            self._speculation_tokens = min(float(self.speculation_budget), self._speculation_tokens + 1)
+            self.speculative_calls -= 1
+
+    def _speculative_followup(self, speculation: FollowUpSpeculation) -> Optional[Completion]:
+        """Background task: generate one candidate unless the speculation was cancelled"""
+        if speculation.cancelled:
+            self._refund_speculation()
+            return None
+        # Candidates share a prompt but must differ, so never coalesce them
+        return self._generate_followup_text(speculation.conversation, speculation.partial_answer, unique=True)
+
+    def speculate_followups(self, partial_answer: str, conversation: List[Dict[str, Any]], count: int = 2) -> FollowUpSpeculation:
+        """Start generating candidate follow-up questions while the candidate is still answering.
+        
+        ``conversation`` holds the turns so far as ``questionText``/``answerText`` dicts, the
+        last one being the question currently being answered. At most
+        ``speculation_budget`` speculative calls are made per ``speculation_window``
+        seconds; calls cancelled before they reach the provider are refunded.
+        """
+        speculation = FollowUpSpeculation(partial_answer, conversation)
+        if not partial_answer.strip():
+            return speculation
+        
+        with self._speculation_lock:
+            allowed = self._take_speculation_budget(count)
+            if allowed and self._speculation_executor is None:
+                self._speculation_executor = ThreadPoolExecutor(max_workers=max(2, count),
+                                                                thread_name_prefix="followup-speculation")
+        
+        if allowed < count:
+            logger.info("Speculation budget reached, starting %d/%d candidates", allowed, count)
+        
+        for _ in range(allowed):
+            # Carry the request's correlation ID (and profile) into the background call
+            context = contextvars.copy_context()
+            future = self._speculation_executor.submit(context.run, self._speculative_followup, speculation)
+            future.add_done_callback(lambda f: f.cancelled() and self._refund_speculation())
+            speculation.futures.append(future)
+        return speculation
+
+    def resolve_followup(self, speculation: Optional[FollowUpSpeculation], final_answer: str,
+                         min_similarity: float = 0.15, timeout: float = 10.0) -> Dict[str, Any]:
+        """Pick the speculative candidate that best fits the final answer, or regenerate.
+        
+        Candidates are only reused when the final answer still resembles the partial
+        transcript they were generated from; the best one is chosen by local word
+        similarity to the final answer.
+        """
+        conversation = speculation.conversation if speculation else []
+        best = None
+        
+        if speculation and not speculation.cancelled and speculation.futures:
+            if _token_similarity(speculation.partial_answer, final_answer) >= 0.5:
+                for future in speculation.futures:
+                    try:
+                        future.result(timeout=timeout)
+                    except Exception as e:
+                        logger.debug("Speculative follow-up failed: %s", e)
+                scored = [(_token_similarity(candidate.text, final_answer), candidate)
+                          for candidate in speculation.candidates()]
+                if scored:
+                    best_score, candidate = max(scored)
+                    if best_score >= min_similarity:
+                        best = candidate
+            speculation.cancel()
+        
+        source = "openrouter_speculative"
+        if not best:
+            source = "openrouter_ai"
+            try:
+                best = self._generate_followup_text(conversation, final_answer)
+            except Exception as e:
+                logger.warning("Error generating follow-up question: %s", e)
+        
+        if not best or not best.text:
+            return {
+                "id": f"fallback_followup_{random.randint(1000, 9999)}",
+                "text": "Can you walk me through a specific example of that in more detail?",
+                "category": "Follow-up",
+                "type": "followup",
+                "source": "fallback"
+            }
+        
+        return {
+            "id": f"openrouter_followup_{random.randint(1000, 9999)}",
+            "text": best.text,
+            "category": "Follow-up",
+            "type": "followup",
+            "source": source,
+            "model_used": best.model
+        }
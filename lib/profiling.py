@@ -0,0 +1,235 @@
+"""
+Request Profiling
+Opt-in per-request span trees, cProfile and tracemalloc reports written to side files
+
+Enable with PROFILE_REQUESTS=true or a "profile": true field in the request. When
+profiling is off, ``span()`` costs one context-variable lookup.
+"""
+
+import contextlib
+import contextvars
+import cProfile
+import io
+import itertools
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from structured_logging import get_logger
+
+DEFAULT_PROFILE_DIR = Path(__file__).parent.parent / 'data' / 'profiles'
+
+_active_span: contextvars.ContextVar = contextvars.ContextVar('profile_span', default=None)
+_NULL_SPAN = contextlib.nullcontext()
+
+# tracemalloc is process-wide: the first session starts it, the last one stops it
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+_session_ids = itertools.count(1)
+
+logger = get_logger('profiling')
+
+
+class Span:
+    """One timed stage of a request"""
+
+    __slots__ = ('name', 'start', 'end', 'children')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.end = None
+        self.children: List['Span'] = []
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'ms': round(self.duration * 1000, 3),
+            'children': [child.to_dict() for child in self.children]
+        }
+
+    def folded(self, prefix: str = '') -> List[str]:
+        """Collapsed stacks ('a;b;c <self microseconds>') for flamegraph.pl, speedscope or inferno"""
+        frame = re.sub(r'[;\s]+', '_', self.name)
+        stack = f"{prefix};{frame}" if prefix else frame
+        self_time = self.duration - sum(child.duration for child in self.children)
+        lines = [f"{stack} {max(0, round(self_time * 1e6))}"]
+        for child in self.children:
+            lines.extend(child.folded(stack))
+        return lines
+
+
+class _SpanContext:
+    __slots__ = ('parent', 'name', 'span', 'token')
+
+    def __init__(self, parent: Span, name: str):
+        self.parent = parent
+        self.name = name
+
+    def __enter__(self) -> Span:
+        self.span = Span(self.name)
+        self.parent.children.append(self.span)
+        self.token = _active_span.set(self.span)
+        return self.span
+
+    def __exit__(self, *exc_info) -> None:
+        self.span.end = time.perf_counter()
+        _active_span.reset(self.token)
+
+
+def span(name: str):
+    """Time a stage under the current span; a shared no-op when no profile is active"""
+    parent = _active_span.get()
+    if parent is None:
+        return _NULL_SPAN
+    return _SpanContext(parent, name)
+
+
+def profiling_requested(request: Optional[Dict[str, Any]] = None) -> bool:
+    """True if PROFILE_REQUESTS is set or the request asks for a profile"""
+    if os.getenv('PROFILE_REQUESTS', 'false').lower() == 'true':
+        return True
+    return isinstance(request, dict) and bool(request.get('profile'))
+
+
+class ProfileSession:
+    """Collects the span tree, CPU profile and allocations for one request.
+
+    CPU profiling covers the calling thread only. When another session already
+    owns the profiler (concurrent requests in one process) the report notes that
+    CPU data was skipped rather than failing the request.
+    """
+
+    def __init__(self, name: str, output_dir: Optional[str] = None, cpu: Optional[bool] = None,
+                 memory: Optional[bool] = None):
+        self.name = name
+        self.output_dir = Path(output_dir or os.getenv('PROFILE_OUTPUT_DIR', DEFAULT_PROFILE_DIR))
+        self.cpu = cpu if cpu is not None else os.getenv('PROFILE_CPU', 'true').lower() == 'true'
+        self.memory = memory if memory is not None else os.getenv('PROFILE_MEMORY', 'true').lower() == 'true'
+        self.root = None
+        self.report_path = None
+        self._profiler = None
+        self._cpu_error = None
+        self._token = None
+        self._memory_started = False
+
+    def __enter__(self) -> 'ProfileSession':
+        global _tracemalloc_users
+        if self.memory:
+            with _tracemalloc_lock:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(25)
+                    _tracemalloc_users = 0
+                _tracemalloc_users += 1
+                self._memory_started = True
+            tracemalloc.reset_peak()
+        if self.cpu:
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError as e:
+                self._profiler = None
+                self._cpu_error = str(e)
+        self.root = Span(self.name)
+        self._token = _active_span.set(self.root)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        global _tracemalloc_users
+        self.root.end = time.perf_counter()
+        _active_span.reset(self._token)
+        if self._profiler is not None:
+            self._profiler.disable()
+
+        snapshot = None
+        peak = None
+        if self._memory_started:
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            with _tracemalloc_lock:
+                _tracemalloc_users -= 1
+                if _tracemalloc_users <= 0:
+                    tracemalloc.stop()
+
+        try:
+            self._write(snapshot, peak)
+        except Exception as e:
+            logger.warning("Failed to write profile for %s: %s", self.name, e)
+
+    def _cpu_report(self, base: Path) -> Dict[str, Any]:
+        if self._profiler is None:
+            return {'skipped': self._cpu_error or 'disabled'}
+        self._profiler.dump_stats(str(base.with_suffix('.pstats')))
+        out = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=out)
+        stats.sort_stats('cumulative')
+        top = []
+        for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+            top.append({
+                'function': f"{os.path.basename(filename)}:{line}({function})",
+                'calls': calls,
+                'total_ms': round(total * 1000, 3),
+                'cumulative_ms': round(cumulative * 1000, 3)
+            })
+        top.sort(key=lambda item: item['cumulative_ms'], reverse=True)
+        return {'pstats': str(base.with_suffix('.pstats')), 'top': top[:30]}
+
+    @staticmethod
+    def _memory_report(snapshot, peak: Optional[int]) -> Dict[str, Any]:
+        if snapshot is None:
+            return {'skipped': 'disabled'}
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')
+        ])
+        top = []
+        for stat in snapshot.statistics('lineno')[:20]:
+            frame = stat.traceback[0]
+            top.append({
+                'location': f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                'size_kb': round(stat.size / 1024, 1),
+                'count': stat.count
+            })
+        # The peak is process-wide, so concurrent sessions see each other's allocations
+        return {'peak_kb': round(peak / 1024, 1) if peak is not None else None, 'top': top}
+
+    def _write(self, snapshot, peak: Optional[int]) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        safe_name = re.sub(r'[^\w.-]+', '_', self.name)
+        base = self.output_dir / f"{safe_name}-{stamp}-{os.getpid()}-{next(_session_ids)}"
+
+        folded_path = base.with_suffix('.folded')
+        with open(folded_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.root.folded()) + '\n')
+
+        report = {
+            'name': self.name,
+            'wall_ms': round(self.root.duration * 1000, 3),
+            'spans': self.root.to_dict(),
+            'folded': str(folded_path),
+            'cpu': self._cpu_report(base),
+            'memory': self._memory_report(snapshot, peak)
+        }
+        self.report_path = base.with_suffix('.json')
+        with open(self.report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info("Profile written to %s", self.report_path)
+
+
+def profile_request(name: str, request: Optional[Dict[str, Any]] = None):
+    """Profile the enclosed block if requested, otherwise do nothing"""
+    if not profiling_requested(request):
+        return _NULL_SPAN
+    return ProfileSession(name)
@@ -0,0 +1,247 @@
+"""
+Streaming Input Parser
+Incrementally reads interview documents from stdin: one JSON object, concatenated objects or NDJSON
+"""
+
+import codecs
+import json
+import re
+from typing import Any, Dict, Iterator, List, Optional
+
+_STRUCTURAL = re.compile(r'[\[\]{}"]')
+# String contents up to the closing quote, skipping escaped characters
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.S)
+_SCALAR_END = re.compile(r'[\s,\]}]')
+_WHITESPACE = ' \t\r\n'
+
+
+class StreamingJSONReader:
+    """Pull parser over a byte or text stream.
+
+    Only the value currently being parsed is buffered, so memory stays bounded by
+    the largest single field or answer rather than by the whole input. Reads use
+    ``read1`` when available so parsing can start before the input is complete.
+    """
+
+    def __init__(self, stream, chunk_size: int = 64 * 1024):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self._read = getattr(stream, 'read1', None) or stream.read
+        self._decoder = None
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Replace the consumed buffer with the next chunk; False at end of input"""
+        if self._eof:
+            return False
+        while True:
+            raw = self._read(self.chunk_size)
+            chunk = raw
+            if isinstance(raw, bytes):
+                if self._decoder is None:
+                    self._decoder = codecs.getincrementaldecoder('utf-8-sig')()
+                try:
+                    chunk = self._decoder.decode(raw, final=not raw)
+                except UnicodeDecodeError as e:
+                    raise self._error(str(e))
+            if not raw:
+                self._eof = True
+                if not chunk:
+                    return False
+            elif not chunk:
+                # The chunk ended inside a multi-byte character; its rest is in the next read
+                continue
+            self._buf = self._buf[self._pos:] + chunk
+            self._pos = 0
+            return True
+
+    def _error(self, message: str) -> ValueError:
+        return ValueError(f"Invalid JSON input: {message}")
+
+    def skip_whitespace(self) -> bool:
+        """Advance past whitespace; False if the input is exhausted"""
+        while True:
+            buf, pos = self._buf, self._pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buf):
+                return True
+            if not self._fill():
+                return False
+
+    def peek(self) -> str:
+        if not self.skip_whitespace():
+            raise self._error("unexpected end of input")
+        return self._buf[self._pos]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise self._error(f"expected '{char}' but found '{self._buf[self._pos]}'")
+        self._pos += 1
+
+    def read_value(self) -> Any:
+        """Parse the next complete JSON value.
+
+        A value spanning several chunks is collected as a list of pieces and joined
+        once at the end, so parsing stays linear in its size.
+        """
+        first = self.peek()
+        start = pos = self._pos
+        pieces = []
+
+        if first not in '{["':
+            while True:
+                match = _SCALAR_END.search(self._buf, pos)
+                if match:
+                    return self._consume(pieces, start, match.start())
+                if not self._next_chunk(pieces, start):
+                    return self._consume(pieces, self._pos, self._pos)
+                start = pos = 0
+
+        depth = 0
+        in_string = False
+        escaped = False
+        while True:
+            buf = self._buf
+            if pos >= len(buf):
+                if not self._next_chunk(pieces, start):
+                    raise self._error("unexpected end of input")
+                start = pos = 0
+                continue
+            if escaped:
+                # The escaped character may arrive in the chunk after its backslash
+                pos += 1
+                escaped = False
+                continue
+            if in_string:
+                pos = _STRING_BODY.match(buf, pos).end()
+                if pos >= len(buf):
+                    continue
+                pos += 1
+                if buf[pos - 1] == '\\':
+                    # A backslash at the end of the chunk
+                    escaped = True
+                    continue
+                in_string = False
+                if depth == 0:
+                    return self._consume(pieces, start, pos)
+                continue
+
+            match = _STRUCTURAL.search(buf, pos)
+            if not match:
+                pos = len(buf)
+                continue
+            char = match.group()
+            pos = match.end()
+            if char == '"':
+                in_string = True
+            elif char in '{[':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return self._consume(pieces, start, pos)
+
+    def _next_chunk(self, pieces: List[str], start: int) -> bool:
+        """Keep the partial value from start and move on to the next chunk"""
+        pieces.append(self._buf[start:])
+        self._pos = len(self._buf)
+        return self._fill()
+
+    def _consume(self, pieces: List[str], start: int, end: int) -> Any:
+        pieces.append(self._buf[start:end])
+        self._pos = end
+        text = pieces[0] if len(pieces) == 1 else ''.join(pieces)
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            raise self._error(str(e))
+
+
+class StreamedInterview:
+    """One interview document whose ``answers`` array is parsed lazily.
+
+    Top-level fields are collected into ``fields`` as they are read. Fields that
+    precede ``answers`` in the document (role, experience, language...) are known
+    before the first answer is yielded; later ones are available once
+    ``answers()`` is exhausted.
+    """
+
+    def __init__(self, reader: StreamingJSONReader, index: int, answers_key: str = 'answers'):
+        self.reader = reader
+        self.index = index
+        self.answers_key = answers_key
+        self.fields: Dict[str, Any] = {}
+        self.answer_count = 0
+        self._started = False
+        self._finished = False
+        self._answers = self._iter_answers()
+
+    def _next_key(self) -> Optional[str]:
+        """Read up to the next key of the object, or None at its end"""
+        char = self.reader.peek()
+        if char == '}':
+            self.reader.expect('}')
+            self._finished = True
+            return None
+        if self._started:
+            self.reader.expect(',')
+        self._started = True
+        key = self.reader.read_value()
+        self.reader.expect(':')
+        return key
+
+    def answers(self) -> Iterator[Dict[str, Any]]:
+        """Yield answers as they are parsed, then read the remaining fields"""
+        return self._answers
+
+    def _iter_answers(self) -> Iterator[Dict[str, Any]]:
+        while not self._finished:
+            key = self._next_key()
+            if key is None:
+                break
+            if key != self.answers_key or self.reader.peek() != '[':
+                self.fields[key] = self.reader.read_value()
+                continue
+
+            self.reader.expect('[')
+            first = True
+            while self.reader.peek() != ']':
+                if not first:
+                    self.reader.expect(',')
+                first = False
+                answer = self.reader.read_value()
+                self.answer_count += 1
+                yield answer
+            self.reader.expect(']')
+
+    def finish(self) -> None:
+        """Skip any unread answers so the next document can be parsed"""
+        for _ in self.answers():
+            pass
+
+
+def iter_interviews(stream, answers_key: str = 'answers') -> Iterator[StreamedInterview]:
+    """Yield interview documents from a stream of one or more JSON objects.
+
+    Accepts a single object, concatenated objects and NDJSON. Each document must be
+    consumed (or is skipped) before the next one is parsed.
+    """
+    reader = StreamingJSONReader(stream)
+    index = 0
+    while reader.skip_whitespace():
+        reader.expect('{')
+        document = StreamedInterview(reader, index, answers_key)
+        yield document
+        document.finish()
+        index += 1
+
+
+def iter_documents(stream) -> Iterator[Any]:
+    """Yield complete JSON values from concatenated or NDJSON input"""
+    reader = StreamingJSONReader(stream)
+    while reader.skip_whitespace():
+        yield reader.read_value()
@@ -0,0 +1,177 @@
+"""
+Structured Logging
+Leveled stderr logging with per-request correlation IDs, rate-limited debug output
+and redaction of candidate content
+
+stdout carries the scripts' JSON responses, so all diagnostics go to stderr.
+
+Environment:
+    LOG_LEVEL=INFO                  DEBUG, INFO, WARNING, ERROR
+    LOG_FORMAT=text                 text or json (one object per line)
+    LOG_DEBUG_RATE_LIMIT=20         debug records per second per call site, 0 for unlimited
+    LOG_DEBUG_SAMPLE_RATE=1.0       fraction of debug records kept before rate limiting
+    LOG_REDACT=true                 hide candidate answers, prompts and model output
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+ROOT_LOGGER = 'interview_coach'
+
+_request_id: contextvars.ContextVar = contextvars.ContextVar('request_id', default=None)
+_configure_lock = threading.Lock()
+_configured = False
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+@contextlib.contextmanager
+def request_context(request_id: Optional[str] = None):
+    """Tag every log record in the block with a correlation ID.
+
+    Without an explicit ID an enclosing request's ID is kept (a job running an
+    analysis logs under the job's ID), otherwise a new one is generated.
+    """
+    if request_id is None and _request_id.get() is not None:
+        yield _request_id.get()
+        return
+    token = _request_id.set(str(request_id or new_request_id()))
+    try:
+        yield _request_id.get()
+    finally:
+        _request_id.reset(token)
+
+
+def redaction_enabled() -> bool:
+    return os.getenv('LOG_REDACT', 'true').lower() != 'false'
+
+
+def redact(text: Any, limit: int = 200) -> str:
+    """Candidate-provided or generated text as it may appear in logs"""
+    text = '' if text is None else str(text)
+    if redaction_enabled():
+        return f"<redacted {len(text)} chars>"
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get() or '-'
+        return True
+
+
+class _DebugThrottleFilter(logging.Filter):
+    """Samples debug records, then rate-limits them per call site.
+
+    Suppressed records are counted and reported on the next record that passes
+    from the same site, so bursts stay visible without flooding the pipe.
+    """
+
+    def __init__(self, rate_per_second: float, sample_rate: float):
+        super().__init__()
+        self.rate = rate_per_second
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[str, int], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        if self.rate <= 0:
+            return True
+
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            # [tokens, last refill, suppressed]
+            bucket = self._buckets.setdefault(site, [self.rate, now, 0])
+            bucket[0] = min(self.rate, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar suppressed)"
+        return True
+
+
+class _JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _StderrHandler(logging.StreamHandler):
+    """Writes to whatever sys.stderr is at emit time, so redirects in callers apply"""
+
+    def __init__(self):
+        super().__init__(sys.stderr)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def configure(force: bool = False) -> logging.Logger:
+    """Set up the package logger from the environment (once per process unless forced)"""
+    global _configured
+    root = logging.getLogger(ROOT_LOGGER)
+    with _configure_lock:
+        if _configured and not force:
+            return root
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+
+        handler = _StderrHandler()
+        if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+            handler.setFormatter(_JSONFormatter())
+        else:
+            handler.setFormatter(logging.Formatter(
+                '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'))
+        handler.addFilter(_RequestIdFilter())
+        handler.addFilter(_DebugThrottleFilter(float(os.getenv('LOG_DEBUG_RATE_LIMIT', '20')),
+                                               float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '1.0'))))
+        root.addHandler(handler)
+
+        level = os.getenv('LOG_LEVEL', 'INFO').upper()
+        root.setLevel(getattr(logging, level, logging.INFO))
+        root.propagate = False
+        _configured = True
+        return root
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the package root, e.g. get_logger('analyzer')"""
+    configure()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
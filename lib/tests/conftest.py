@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The lib modules import each other as top-level modules, as they do when run as scripts
+sys.path.insert(0, str(Path(__file__).parent.parent))
+# Benchmark scripts and the mock provider are imported the same way
+sys.path.insert(0, str(Path(__file__).parent.parent / 'benchmarks'))
@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+from analysis_jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, AnalysisJobQueue, AnalysisWorkerPool, LeaseLostError
+
+INTERVIEW = {'role': 'Backend', 'answers': [{'question': 'q1', 'answer': 'a1'}, {'question': 'q2', 'answer': 'a2'}]}
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    queue = AnalysisJobQueue(str(tmp_path / 'jobs.db'), visibility_timeout=0.2, max_attempts=2, retry_delay=0)
+    yield queue
+    queue.close()
+
+
+def _expire_lease():
+    time.sleep(0.25)
+
+
+def test_submit_with_same_idempotency_key_returns_the_same_job(job_queue):
+    first = job_queue.submit(dict(INTERVIEW, idempotencyKey='attempt-1'))
+    assert job_queue.submit(dict(INTERVIEW, idempotencyKey='attempt-1')) == first
+    assert job_queue.submit(INTERVIEW, idempotency_key='attempt-1') == first
+    assert job_queue.submit(INTERVIEW, idempotency_key='attempt-2') != first
+    assert job_queue.counts() == {QUEUED: 2}
+
+
+def test_expired_lease_is_redelivered_without_stale_partials(job_queue):
+    job_id = job_queue.submit(INTERVIEW)
+    claimed_id, token, payload = job_queue.claim('worker-a')
+    assert claimed_id == job_id
+    assert job_queue.claim('worker-b') is None
+    job_queue.record_partial(job_id, token, 0, {'questionId': 'q1', 'score': 40})
+    assert job_queue.status(job_id)['progress'] == {'completed': 1, 'total': 2}
+
+    _expire_lease()
+    redelivered_id, new_token, redelivered = job_queue.claim('worker-b')
+
+    status = job_queue.status(job_id)
+    assert redelivered_id == job_id and new_token != token
+    assert redelivered['id'] == payload['id']
+    assert status['status'] == RUNNING and status['attempts'] == 2
+    assert status['progress'] == {'completed': 0, 'total': 2}
+    assert status['questionAnalysis'] == []
+
+
+def test_stale_token_cannot_publish_or_complete(job_queue):
+    job_id = job_queue.submit(INTERVIEW)
+    _, stale_token, _ = job_queue.claim('worker-a')
+    _expire_lease()
+    _, token, _ = job_queue.claim('worker-b')
+
+    with pytest.raises(LeaseLostError):
+        job_queue.record_partial(job_id, stale_token, 0, {'score': 1})
+    with pytest.raises(LeaseLostError):
+        job_queue.complete(job_id, stale_token, {'overallScore': 1})
+
+    job_queue.complete(job_id, token, {'overallScore': 80})
+    assert job_queue.status(job_id)['status'] == SUCCEEDED
+    assert job_queue.result(job_id) == {'overallScore': 80}
+
+
+def test_lease_expiring_on_the_final_attempt_fails_the_job(job_queue):
+    job_id = job_queue.submit(INTERVIEW)
+    for worker in ('worker-a', 'worker-b'):
+        assert job_queue.claim(worker)[0] == job_id
+        _expire_lease()
+
+    assert job_queue.claim('worker-c') is None
+    status = job_queue.status(job_id)
+    assert status['status'] == FAILED
+    assert status['error'] == 'Lease expired on the final attempt'
+    assert job_queue.result(job_id) is None
+
+
+def test_failed_attempt_is_retried_until_attempts_run_out(job_queue):
+    job_id = job_queue.submit(INTERVIEW)
+    _, token, _ = job_queue.claim('worker-a')
+    job_queue.fail(job_id, token, 'upstream error')
+    assert job_queue.status(job_id)['status'] == QUEUED
+
+    _, token, _ = job_queue.claim('worker-a')
+    job_queue.fail(job_id, token, 'upstream error')
+    assert job_queue.status(job_id)['status'] == FAILED
+    assert job_queue.claim('worker-a') is None
+
+
+class _FakeAnalyzer:
+    def analyze_interview(self, interview, on_answer=None):
+        for position, answer in enumerate(interview['answers']):
+            on_answer(position, {'questionId': answer['question'], 'score': 70})
+        return {'overallScore': 70}
+
+
+def test_worker_pool_publishes_partials_and_completes_jobs(job_queue):
+    job_ids = [job_queue.submit(INTERVIEW) for _ in range(3)]
+    pool = AnalysisWorkerPool(job_queue, concurrency=2, poll_interval=0.01, analyzer_factory=_FakeAnalyzer)
+    pool.start()
+    try:
+        results = [job_queue.result(job_id, wait=5) for job_id in job_ids]
+    finally:
+        pool.stop(5)
+
+    assert results == [{'overallScore': 70}] * 3
+    assert job_queue.status(job_ids[0])['progress'] == {'completed': 2, 'total': 2}
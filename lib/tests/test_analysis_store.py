@@ -0,0 +1,47 @@
+import pytest
+
+from analysis_store import AnalysisStore, decode_cursor, encode_cursor, normalize_timestamp
+
+
+@pytest.mark.parametrize('value', [
+    '2025-08-12T18:44:13.877Z',
+    '2025-08-12T18:44:13.877+00:00',
+    '2025-08-13T00:14:13.877+05:30',
+    '2025-08-12T18:44:13.877',
+    1755024253877,
+    1755024253.877,
+    '1755024253877',
+])
+def test_normalize_timestamp_returns_utc_iso(value):
+    assert normalize_timestamp(value) == '2025-08-12T18:44:13.877+00:00'
+
+
+def test_normalize_timestamp_falls_back_to_now():
+    for value in (None, '', 'yesterday'):
+        assert normalize_timestamp(value).endswith('+00:00')
+
+
+def test_mixed_timestamp_formats_page_in_time_order(tmp_path):
+    store = AnalysisStore(str(tmp_path / 'analyses.db'))
+    timestamps = ['2025-08-10T09:00:00Z', 1754920800000, '2025-08-12T09:00:00+05:30', 1755100000]
+    for index, timestamp in enumerate(timestamps):
+        store.save({'id': f'interview_{index}', 'userId': 'u1', 'timestamp': timestamp},
+                   {'overallScore': 70, 'questionAnalysis': [{'questionId': 1, 'score': 70}]})
+    store.flush()
+
+    seen, cursor = [], None
+    while True:
+        page = store.list_interviews(user_id='u1', limit=1, cursor=decode_cursor(encode_cursor(cursor)))
+        seen.extend(item['created_at'] for item in page['interviews'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    store.close()
+
+    assert len(seen) == len(timestamps)
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
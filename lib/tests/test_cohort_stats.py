@@ -0,0 +1,154 @@
+import multiprocessing
+import random
+
+import pytest
+
+from cohort_stats import CohortStats, TDigest
+
+
+def _exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def test_tdigest_quantiles_track_exact_values():
+    rng = random.Random(7)
+    values = [rng.gauss(60, 15) for _ in range(20000)]
+    digest = TDigest()
+    for value in values:
+        digest.add(value)
+
+    for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+        assert digest.quantile(q) == pytest.approx(_exact_quantile(values, q), abs=1.0)
+    assert digest.quantile(0.0) == pytest.approx(min(values), abs=1.0)
+    assert digest.quantile(1.0) == pytest.approx(max(values), abs=1.0)
+
+
+def test_tdigest_cdf_is_inverse_of_quantile():
+    rng = random.Random(11)
+    digest = TDigest()
+    for _ in range(5000):
+        digest.add(rng.uniform(0, 100))
+
+    assert digest.cdf(-1) == 0.0
+    assert digest.cdf(101) == 1.0
+    for value in (10, 25, 50, 75, 90):
+        assert digest.cdf(value) == pytest.approx(value / 100, abs=0.02)
+        assert digest.cdf(digest.quantile(value / 100)) == pytest.approx(value / 100, abs=0.01)
+
+
+def test_tdigest_merge_matches_single_digest():
+    rng = random.Random(3)
+    values = [rng.expovariate(0.05) for _ in range(10000)]
+    whole = TDigest()
+    parts = [TDigest() for _ in range(4)]
+    for i, value in enumerate(values):
+        whole.add(value)
+        parts[i % 4].add(value)
+
+    merged = TDigest()
+    for part in parts:
+        merged.merge(TDigest.from_dict(part.to_dict()))
+
+    assert merged.count == whole.count == len(values)
+    assert merged.min == min(values)
+    assert merged.max == max(values)
+    for q in (0.05, 0.5, 0.95):
+        assert merged.quantile(q) == pytest.approx(whole.quantile(q), rel=0.03)
+    assert len(merged.centroids) <= 2 * merged.compression
+
+
+def test_empty_and_single_value_digests():
+    digest = TDigest()
+    assert digest.quantile(0.5) is None
+    assert digest.cdf(1) is None
+    digest.add(42)
+    assert digest.quantile(0.5) == 42
+    digest.merge(TDigest())
+    assert digest.count == 1
+
+
+def test_benchmark_needs_min_samples_and_falls_back_to_broader_cohort(tmp_path):
+    stats = CohortStats(path=str(tmp_path / 'cohorts.db'), min_samples=5)
+    for score in range(10):
+        stats.record('Backend Engineer', 'Senior', 'en', {'overall': score * 10})
+    stats.record('Backend Engineer', 'Junior', 'hi', {'overall': 50})
+    stats.save()
+
+    reread = CohortStats(path=str(tmp_path / 'cohorts.db'), min_samples=5)
+    exact = reread.benchmark('backend  engineer', 'senior', 'EN', {'overall': 85})
+    assert exact['cohort'] == 'backend engineer, senior, en'
+    assert exact['sampleSize'] == 10
+    assert 80 <= exact['percentiles']['overall'] <= 95
+
+    broader = reread.benchmark('Backend Engineer', 'Junior', 'hi', {'overall': 85})
+    assert broader['cohort'] == 'backend engineer'
+    assert broader['sampleSize'] == 11
+
+
+def test_save_merges_with_rows_written_by_others(tmp_path):
+    path = str(tmp_path / 'cohorts.db')
+    first, second = CohortStats(path=path), CohortStats(path=path)
+    first.record('QA', 'Mid', 'en', {'overall': 40})
+    second.record('QA', 'Mid', 'en', {'overall': 60})
+    first.save()
+    second.save()
+    second.save()  # nothing new, must not double count
+
+    stored = CohortStats(path=path, min_samples=1)
+    assert stored.benchmark('QA', 'Mid', 'en', {'overall': 50})['sampleSize'] == 2
+    assert second.cohorts['all']['overall'].count == 2
+
+
+def _record_and_save(path, worker, interviews, start):
+    stats = CohortStats(path=path)
+    for i in range(interviews):
+        stats.record(f"role {i % 3}", 'Mid', 'en', {'overall': (worker * 7 + i) % 100})
+    start.wait()
+    stats.save()
+    stats.close()
+
+
+def test_concurrent_saves_from_processes_lose_no_observations(tmp_path):
+    path = str(tmp_path / 'cohorts.db')
+    workers, interviews = 4, 50
+    ctx = multiprocessing.get_context('spawn')
+    start = ctx.Event()
+    processes = [ctx.Process(target=_record_and_save, args=(path, worker, interviews, start))
+                 for worker in range(workers)]
+    for process in processes:
+        process.start()
+    start.set()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    stored = CohortStats(path=path, min_samples=1)
+    assert stored.benchmark('anything', 'x', 'y', {'overall': 1})['sampleSize'] == workers * interviews
+    assert stored.benchmark('role 0', 'x', 'y', {'overall': 1})['sampleSize'] == workers * 17
+
+
+def test_max_cohorts_caps_stored_rows(tmp_path):
+    stats = CohortStats(path=str(tmp_path / 'cohorts.db'), max_cohorts=4)
+    stats.record('A', 'Mid', 'en', {'overall': 10})
+    stats.record('B', 'Mid', 'en', {'overall': 20})
+    stats.save()
+
+    stored = CohortStats(path=str(tmp_path / 'cohorts.db'), min_samples=1)
+    assert stored.benchmark('B', 'Mid', 'en', {'overall': 20})['cohort'] == 'all candidates'
+    assert stored.benchmark('A', 'Mid', 'en', {'overall': 10})['sampleSize'] == 1
+
+
+def test_cached_cohorts_stay_within_max_cohorts(tmp_path):
+    stats = CohortStats(path=str(tmp_path / 'cohorts.db'), max_cohorts=10, min_samples=1)
+    for i in range(3000):
+        stats.record(f'role {i}', 'Mid', 'en', {'overall': i % 100})
+        stats.benchmark(f'role {i}', 'Mid', 'en', {'overall': 50})
+        if i % 100 == 0:
+            stats.save()
+        assert len(stats.cohorts) <= 10
+    stats.save()
+
+    assert len(stats.cohorts) <= 10
+    assert stats.benchmark('role 2999', 'Mid', 'en', {'overall': 50})['cohort'] == 'all candidates'
+    assert stats.benchmark('anything', 'x', 'y', {'overall': 50})['sampleSize'] == 3000
@@ -0,0 +1,22 @@
+import pytest
+
+from replay_load import percentile
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile(values, 7) == 7
+
+    ten = [float(v) for v in range(1, 11)]
+    assert percentile(ten, 50) == 5
+    assert percentile(ten, 95) == 10
+    assert percentile(ten, 0) == 1
+
+
+@pytest.mark.parametrize('values, expected', [([], None), ([3.0], 3.0)])
+def test_percentile_of_short_inputs(values, expected):
+    assert percentile(values, 95) == expected
@@ -0,0 +1,109 @@
+import io
+import json
+
+import pytest
+
+from stream_input import StreamingJSONReader, iter_documents, iter_interviews
+
+
+class ChunkedStream(io.RawIOBase):
+    """Byte stream whose read1 returns at most n bytes, like a pipe delivering small writes"""
+
+    def __init__(self, data: bytes, n: int):
+        self.data = data
+        self.n = n
+        self.offset = 0
+
+    def readable(self):
+        return True
+
+    def read1(self, size=-1):
+        chunk = self.data[self.offset:self.offset + min(self.n, size if size > 0 else self.n)]
+        self.offset += len(chunk)
+        return chunk
+
+
+DOCUMENT = {
+    "role": "Backend Engineer",
+    "language": "hi",
+    "answers": [
+        {"questionText": "क्या \"quoted\" है?", "answerText": "नमस्ते \\ back\\slash é 😀 end"},
+        {"questionText": "}{][", "answerText": "", "score": -1.5e3, "flags": [True, False, None]}
+    ],
+    "interviewDuration": 55
+}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 64])
+def test_values_split_across_chunks(chunk_size):
+    for ensure_ascii in (True, False):
+        data = json.dumps(DOCUMENT, ensure_ascii=ensure_ascii).encode('utf-8')
+        assert list(iter_documents(ChunkedStream(data, chunk_size))) == [DOCUMENT]
+
+
+def test_multibyte_character_split_between_reads():
+    # 'न' is three bytes in UTF-8; a read ending inside it decodes to nothing yet
+    data = '{"answerText": "न"}'.encode('utf-8')
+    split = data.index('न'.encode('utf-8')) + 1
+    assert list(iter_documents(ChunkedStream(data, split))) == [{"answerText": "न"}]
+
+
+def test_escapes_and_backslash_at_chunk_boundary():
+    value = {"text": 'a\\"b\\\\"c\\n\\u0041' + '\\' * 7 + '"'}
+    data = json.dumps(value).encode()
+    for chunk_size in range(1, len(data) + 1):
+        assert list(iter_documents(ChunkedStream(data, chunk_size))) == [value]
+
+
+def test_ndjson_and_concatenated_documents():
+    documents = [{"n": i, "answers": [{"answerText": f"answer {i}"}]} for i in range(3)]
+    ndjson = ''.join(json.dumps(d) + '\n' for d in documents).encode()
+    concatenated = ''.join(json.dumps(d) for d in documents).encode()
+    bare_scalars = b'1 "two" [3] {"four": 4}\n'
+
+    assert list(iter_documents(ChunkedStream(ndjson, 5))) == documents
+    assert list(iter_documents(ChunkedStream(concatenated, 5))) == documents
+    assert list(iter_documents(ChunkedStream(bare_scalars, 3))) == [1, "two", [3], {"four": 4}]
+
+
+def test_text_streams_and_byte_order_mark():
+    assert list(iter_documents(io.StringIO('{"a": 1}\n{"a": 2}'))) == [{"a": 1}, {"a": 2}]
+    assert list(iter_documents(io.BytesIO(b'\xef\xbb\xbf{"a": 1}'))) == [{"a": 1}]
+
+
+@pytest.mark.parametrize('data', [b'{"a": 1', b'{"a": "unterminated', b'{"a": tru}', b'{"a": "\xe0\xa4'])
+def test_invalid_input_raises_value_error(data):
+    with pytest.raises(ValueError, match='Invalid JSON input'):
+        list(iter_documents(ChunkedStream(data, 2)))
+
+
+def test_interviews_yield_answers_lazily_and_collect_fields():
+    documents = [dict(DOCUMENT, requestId=f"r{i}") for i in range(2)]
+    data = ''.join(json.dumps(d, ensure_ascii=False) + '\n' for d in documents).encode()
+
+    seen = []
+    for document in iter_interviews(ChunkedStream(data, 11)):
+        answers = document.answers()
+        first = next(answers)
+        # Fields before the answers are known once the first answer is read
+        assert document.fields == {"role": "Backend Engineer", "language": "hi"}
+        assert first == DOCUMENT["answers"][0]
+        assert list(answers) == DOCUMENT["answers"][1:]
+        assert document.fields["interviewDuration"] == 55
+        seen.append((document.index, document.fields["requestId"], document.answer_count))
+    assert seen == [(0, "r0", 2), (1, "r1", 2)]
+
+
+def test_unread_answers_are_skipped_before_the_next_interview():
+    data = b'{"answers": [{"a": 1}, {"a": 2}], "role": "x"} {"answers": [], "role": "y"}'
+    documents = []
+    for document in iter_interviews(ChunkedStream(data, 4)):
+        documents.append(document)
+    for document in documents:
+        document.finish()
+    assert [document.fields for document in documents] == [{"role": "x"}, {"role": "y"}]
+
+
+def test_large_value_spanning_many_chunks():
+    reader = StreamingJSONReader(ChunkedStream(json.dumps({"a": "word " * 2_000_000}).encode(), 64 * 1024))
+    assert len(reader.read_value()["a"]) == 10_000_000
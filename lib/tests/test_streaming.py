@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from inference_providers import StreamStalledError, _stream_chat_completion
+from language_registry import get_language_pack
+from mock_provider import LatencyModel, canned_response, serve
+from openrouter_questgen import OpenRouterQuestionGenerator
+
+MCQ_TEXT = canned_response([{'content': get_language_pack('en').mcq_prompt('Backend role', 3)}])
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    servers = []
+
+    def start(**kwargs):
+        server = serve(0, background=True, **kwargs)
+        servers.append(server)
+        monkeypatch.setenv('OPENROUTER_BASE_URL', f"http://127.0.0.1:{server.server_address[1]}/v1")
+        monkeypatch.setenv('OPENROUTER_API_KEY', 'test')
+        for name in ('INFERENCE_PROVIDER', 'INFERENCE_ROUTES', 'LOCAL_LLM_URL', 'LOCAL_LLM_MODEL_PATH',
+                     'MODEL_TIERING_ENABLED'):
+            monkeypatch.delenv(name, raising=False)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _timed(iterator):
+    start = time.monotonic()
+    events = [(time.monotonic() - start, item) for item in iterator]
+    return events, time.monotonic() - start
+
+
+def test_mcqs_are_yielded_before_the_stream_ends(mock_server):
+    mock_server(latency=LatencyModel(token_ms=15))
+    generator = OpenRouterQuestionGenerator()
+
+    events, total = _timed(generator.stream_mcq_questions('Backend role', 3))
+
+    assert [question['source'] for _, question in events] == ['openrouter_ai'] * 3
+    assert events[0][0] < total / 2
+    assert events[0][1]['options'] == ['Linked list', 'Hash map', 'Binary heap', 'Stack']
+    assert events[0][1]['correct_answer'] == 'Hash map'
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64])
+def test_mcq_stream_parser_handles_any_chunk_split(size):
+    pack = get_language_pack('en')
+    parser = pack.mcq_stream_parser()
+    parsed = []
+    for start in range(0, len(MCQ_TEXT), size):
+        parsed.extend(parser.feed(MCQ_TEXT[start:start + size]))
+    parsed.extend(parser.close())
+
+    expected = ('Which data structure gives O(1) average lookup by key?',
+                ['Linked list', 'Hash map', 'Binary heap', 'Stack'], 'Hash map')
+    assert parsed == [expected] * 3
+
+
+def test_mcq_stream_parser_completes_question_on_correct_line():
+    parser = get_language_pack('en').mcq_stream_parser()
+    assert parser.feed("Question: Pick one\nA) a\nB) b\nC) c\nD) d\nCorr") == []
+    assert parser.feed("ect: C") == []
+    assert parser.feed("\n") == [('Pick one', ['a', 'b', 'c', 'd'], 'c')]
+    assert parser.close() == []
+
+
+def test_stalled_stream_raises_within_the_inter_token_timeout_despite_keepalives(mock_server):
+    server = mock_server(stall_after=3, keepalive=0.1)
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    deltas = []
+    start = time.monotonic()
+
+    with pytest.raises(StreamStalledError):
+        for delta in _stream_chat_completion(url, {}, {"messages": [{"role": "user", "content": "hi"}]}, 0.5):
+            deltas.append(delta)
+
+    assert len(deltas) == 3
+    assert time.monotonic() - start < 2.0
+
+
+def test_questions_missing_after_a_stall_are_filled_with_fallbacks(mock_server, monkeypatch):
+    monkeypatch.setenv('OPENROUTER_STREAM_TOKEN_TIMEOUT', '0.5')
+    # The first MCQ is 23 tokens, so the stream stalls right after it
+    mock_server(stall_after=23, keepalive=0.1)
+    generator = OpenRouterQuestionGenerator()
+
+    start = time.monotonic()
+    questions = list(generator.stream_mcq_questions('Backend role', 3))
+
+    assert [question['source'] for question in questions] == ['openrouter_ai', 'fallback', 'fallback']
+    assert questions[0]['correct_answer'] == 'Hash map'
+    assert time.monotonic() - start < 3.0